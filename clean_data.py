@@ -1,6 +1,8 @@
 import os
 import shutil
 import logging
+import threading
+import time
 
 # Configure logging
 logging.basicConfig(
@@ -11,13 +13,20 @@ logging.basicConfig(
 def clean_folder(folder_path: str) -> None:
     """Clean all contents of a folder if it exists."""
     try:
-        if os.path.exists(folder_path):
-            shutil.rmtree(folder_path)
-            os.makedirs(folder_path)
-            logging.info(f"✨ Cleaned folder: {folder_path}")
-        else:
+        # Move the folder aside (a single rename) and delete it in the background,
+        # so the empty folder is available immediately even for large trees
+        trash_path = f"{folder_path}.trash.{os.getpid()}.{time.time_ns()}"
+        try:
+            os.rename(folder_path, trash_path)
+        except FileNotFoundError:
             os.makedirs(folder_path)
             logging.info(f"📁 Created folder: {folder_path}")
+            return
+        
+        # Non-daemon thread: the interpreter waits for it, so no trash is left behind
+        threading.Thread(target=shutil.rmtree, args=(trash_path,), kwargs={'ignore_errors': True}).start()
+        os.makedirs(folder_path)
+        logging.info(f"✨ Cleaned folder: {folder_path}")
     except Exception as e:
         logging.error(f"❌ Error cleaning {folder_path}: {str(e)}")
 
@@ -1,21 +1,23 @@
 import os
-from moviepy.editor import VideoFileClip
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from utils.ffmpeg import extract_audio
+from utils.files import iter_media
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Conversiones simultáneas; workers x hilos de ffmpeg ≈ núcleos disponibles
+FFMPEG_THREADS = 2
+MAX_WORKERS = max(1, (os.cpu_count() or 2) // FFMPEG_THREADS)
+
 def convert_video_to_mp3(video_path, output_path):
     try:
-        video = VideoFileClip(video_path)
-        audio = video.audio
-        audio.write_audiofile(output_path)
-        video.close()
-        audio.close()
+        extract_audio(video_path, output_path, threads=FFMPEG_THREADS)
         return True
     except Exception as e:
-        logger.error(f"Error converting {video_path}: {str(e)}")
+        logger.error("Error converting %s: %s", video_path, e)
         return False
 
 def main():
@@ -27,27 +29,30 @@ def main():
     os.makedirs(transcript_dir, exist_ok=True)
     
     # Obtener lista de videos
-    video_files = [f for f in os.listdir(downloads_dir) if f.endswith(('.mp4', '.webm'))]
+    video_files = list(iter_media(downloads_dir, ('.mp4', '.webm')))
     
     if not video_files:
         logger.info("No se encontraron videos para convertir")
         return
     
-    logger.info(f"Encontrados {len(video_files)} videos para convertir")
+    logger.info("Encontrados %s videos para convertir", len(video_files))
     
-    # Procesar cada video
-    successful = 0
-    for video_file in video_files:
-        video_path = os.path.join(downloads_dir, video_file)
+    # Procesar los videos en paralelo
+    def convert(entry):
+        video_file = entry.name
         output_file = os.path.splitext(video_file)[0] + '.mp3'
         output_path = os.path.join(transcript_dir, output_file)
         
-        logger.info(f"Convirtiendo: {video_file}")
-        if convert_video_to_mp3(video_path, output_path):
-            successful += 1
-            logger.info(f"Convertido exitosamente: {output_file}")
+        logger.info("Convirtiendo: %s", video_file)
+        if convert_video_to_mp3(entry.path, output_path):
+            logger.info("Convertido exitosamente: %s", output_file)
+            return True
+        return False
+    
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        successful = sum(executor.map(convert, video_files))
     
-    logger.info(f"Proceso completado: {successful} de {len(video_files)} videos convertidos")
+    logger.info("Proceso completado: %s de %s videos convertidos", successful, len(video_files))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
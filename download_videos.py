@@ -1,31 +1,48 @@
 import asyncio
 import sys
+from utils.config import load_config
 from utils.downloader import YoutubeDownloader
 from utils.logger import Logger
 
+def print_usage():
+    print("\nUsage:")
+    print("Single URL: python download_videos.py https://youtube.com/watch?v=...")
+    print("Multiple URLs from file: python download_videos.py urls.txt [workers]")
+
 async def main():
     logger = Logger("main")
-    downloader = YoutubeDownloader()
     
     if len(sys.argv) < 2:
         logger.error("Please provide a URL or a file containing URLs")
-        print("\nUsage:")
-        print("Single URL: python download_videos.py https://youtube.com/watch?v=...")
-        print("Multiple URLs from file: python download_videos.py urls.txt")
+        print_usage()
         return
     
     input_path = sys.argv[1]
     
+    # Optional second argument: how many downloads may run in parallel
+    workers = None
+    if len(sys.argv) > 2:
+        try:
+            workers = int(sys.argv[2])
+        except ValueError:
+            workers = 0
+        if workers < 1:
+            logger.error(f"workers must be a positive integer, got {sys.argv[2]!r}")
+            print_usage()
+            return
+    
+    downloader = YoutubeDownloader(load_config()['download']['output_dir'])
+    
     if input_path.startswith(('http://', 'https://', 'www.', 'youtube.com', 'youtu.be')):
         # Single URL
-        success = await downloader.download_url(input_path)
-        if success:
+        file_path, _ = await downloader.download_url(input_path)
+        if file_path:
             logger.info("Download completed successfully")
         else:
             logger.error("Download failed")
     else:
         # File with URLs
-        await downloader.download_from_file(input_path)
+        await downloader.download_from_file(input_path, max_workers=workers)
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
@@ -2,12 +2,18 @@ import os
 import sys
 import time
 import logging
+import logging.handlers
 import traceback
+import tempfile
 import asyncio
 import dotenv
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
 import openai
-from moviepy.editor import VideoFileClip
 from utils.downloader import YoutubeDownloader
+from utils.ffmpeg import compress_for_whisper, extract_audio
+from utils.files import existing_stems, iter_media
 
 # Cargar variables de entorno (API keys)
 dotenv.load_dotenv()
@@ -16,12 +22,23 @@ dotenv.load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
 # Configuración de logging
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# El archivo de log recibe los registros en bloques de 1000 (o de inmediato ante
+# un ERROR) en vez de una escritura por línea; al salir, logging vacía el resto
+log_file_handler = logging.FileHandler('full_pipeline.log')
+log_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
         logging.StreamHandler(sys.stdout),
-        logging.FileHandler('full_pipeline.log')
+        logging.handlers.MemoryHandler(
+            capacity=1000,
+            flushLevel=logging.ERROR,
+            target=log_file_handler
+        )
     ]
 )
 logger = logging.getLogger(__name__)
@@ -32,247 +49,297 @@ DIRS = {
     "downloads": "Descargas",    # Videos descargados
     "audio": "Transcript",      # Audios convertidos
     "transcripts": "Transcripciones",  # Transcripciones
-    "summaries": "Resumenes"     # Resúmenes
+    "summaries": "Resumenes"    # Resúmenes
 }
 
+# Conversiones simultáneas; workers x hilos de ffmpeg ≈ núcleos disponibles
+FFMPEG_THREADS = 2
+CONVERSION_WORKERS = max(1, (os.cpu_count() or 2) // FFMPEG_THREADS)
+
+# Peticiones simultáneas a la API de OpenAI
+TRANSCRIPTION_CONCURRENCY = 8
+SUMMARY_CONCURRENCY = 5
+
+# Conexiones HTTP abiertas a la vez hacia OpenAI
+OPENAI_MAX_CONNECTIONS = 64
+
 def ensure_directories():
     """Asegura que existan todos los directorios necesarios"""
     for directory in list(DIRS.values())[1:]:  # Todos menos el archivo de URLs
         os.makedirs(directory, exist_ok=True)
-        logger.debug(f"Directorio asegurado: {directory}")
-
-def already_exists(filename, directory, extension=None):
-    """Verifica si un archivo ya existe en el directorio especificado"""
-    base_name = os.path.splitext(filename)[0]
-    if extension:
-        check_file = os.path.join(directory, f"{base_name}{extension}")
-    else:
-        # Buscar cualquier archivo con el mismo nombre base
-        for file in os.listdir(directory):
-            if os.path.splitext(file)[0] == base_name:
-                return True
-        return False
-    
-    return os.path.exists(check_file)
+        logger.debug("Directorio asegurado: %s", directory)
 
 async def download_videos():
     """Paso 1: Descarga videos desde URLs en el archivo"""
     logger.info("=== PASO 1: DESCARGA DE VIDEOS ===")
     
-    # Crear directorio si no existe
-    os.makedirs(DIRS["downloads"], exist_ok=True)
-    
     # Inicializar el descargador
-    downloader = YoutubeDownloader()
+    downloader = YoutubeDownloader(DIRS["downloads"])
     
     # Descargar desde archivo
     try:
         await downloader.download_from_file(DIRS["urls"])
     except Exception as e:
-        logger.error(f"Error en la descarga de videos: {str(e)}")
+        logger.error("Error en la descarga de videos: %s", e)
         logger.error(traceback.format_exc())
 
+def convert_video_task(task):
+    """Convierte un video (video_path, audio_path) a MP3 y retorna si tuvo éxito"""
+    video_path, audio_path = task
+    video = os.path.basename(video_path)
+    logger.info("Convirtiendo video a audio: %s", video)
+    
+    try:
+        # Extraer solo la pista de audio a MP3 con ffmpeg
+        extract_audio(video_path, audio_path, threads=FFMPEG_THREADS)
+        logger.info("Audio guardado: %s", os.path.basename(audio_path))
+        return True
+    except Exception as e:
+        logger.error("Error al convertir %s: %s", video, e)
+        logger.error(traceback.format_exc())
+        return False
+
 def convert_videos_to_audio():
     """Paso 2: Convierte los videos descargados a audio MP3"""
     logger.info("=== PASO 2: CONVERSIÓN A AUDIO ===")
     
     # Obtener lista de videos
-    videos = [f for f in os.listdir(DIRS["downloads"]) if f.endswith(('.mp4', '.webm', '.mkv'))]
+    videos = list(iter_media(DIRS["downloads"], ('.mp4', '.webm', '.mkv')))
     
     if not videos:
         logger.info("No hay videos para convertir")
         return
     
-    logger.info(f"Encontrados {len(videos)} videos para convertir")
+    logger.info("Encontrados %s videos para convertir", len(videos))
     
     # Contadores
     processed = 0
     failed = 0
     skipped = 0
     
-    # Procesar cada video
-    for video in videos:
-        video_path = os.path.join(DIRS["downloads"], video)
+    # Preparar las tareas pendientes
+    converted = existing_stems(DIRS["audio"], ".mp3")
+    tasks = []
+    for entry in videos:
+        video = entry.name
         base_name = os.path.splitext(video)[0]
         audio_path = os.path.join(DIRS["audio"], f"{base_name}.mp3")
         
         # Verificar si ya existe
-        if os.path.exists(audio_path):
-            logger.info(f"Omitiendo (ya convertido): {video}")
+        if base_name in converted:
+            logger.info("Omitiendo (ya convertido): %s", video)
             skipped += 1
             continue
         
-        logger.info(f"Convirtiendo video a audio: {video}")
-        
+        tasks.append((entry.path, audio_path))
+    
+    # Convertir en paralelo: cada worker solo espera a su proceso de ffmpeg
+    with ThreadPoolExecutor(max_workers=CONVERSION_WORKERS) as executor:
+        for ok in executor.map(convert_video_task, tasks):
+            if ok:
+                processed += 1
+            else:
+                failed += 1
+    
+    logger.info("Conversión completa: %s procesados, %s fallidos, %s omitidos", processed, failed, skipped)
+
+def prepare_whisper_audio(audio_path):
+    """Crea una copia temporal mono de 16 kHz y 64 kbps del audio y retorna su ruta; quien llama la borra"""
+    # Una copia nueva por transcripción: nunca queda una versión vieja si el audio
+    # original cambia, ni se acumulan copias en disco
+    fd, upload_path = tempfile.mkstemp(suffix=".mp3")
+    os.close(fd)
+    try:
+        compress_for_whisper(audio_path, upload_path)
+    except BaseException:
+        os.remove(upload_path)
+        raise
+    return upload_path
+
+async def transcribe_audio(audio_path, semaphore):
+    """Transcribe un archivo de audio usando la API de OpenAI"""
+    async with semaphore:
         try:
-            # Convertir a MP3
-            video_clip = VideoFileClip(video_path)
-            audio = video_clip.audio
-            audio.write_audiofile(audio_path, logger=None)  # Silenciar logs de moviepy
-            video_clip.close()
-            audio.close()
-            
-            logger.info(f"Audio guardado: {os.path.basename(audio_path)}")
-            processed += 1
+            # Subir una versión comprimida: ~3 veces menos bytes que el MP3 a 192 kbps
+            upload_path = await asyncio.to_thread(prepare_whisper_audio, audio_path)
             
+            try:
+                logger.info("Enviando audio a OpenAI para transcripción: %s", os.path.basename(audio_path))
+                with open(upload_path, "rb") as audio_file:
+                    response = await openai.Audio.atranscribe(
+                        model="whisper-1",
+                        file=audio_file,
+                        response_format="text"
+                    )
+            finally:
+                os.remove(upload_path)
+            return response
         except Exception as e:
-            logger.error(f"Error al convertir {video}: {str(e)}")
-            logger.error(traceback.format_exc())
-            failed += 1
-    
-    logger.info(f"Conversión completa: {processed} procesados, {failed} fallidos, {skipped} omitidos")
+            logger.error("Error al transcribir audio: %s", e)
+            return None
 
-def transcribe_audio(audio_path):
-    """Transcribe un archivo de audio usando la API de OpenAI"""
+async def transcribe_file(audio_path, transcript_path, semaphore):
+    """Transcribe un archivo y guarda el resultado; retorna si tuvo éxito"""
+    audio_file = os.path.basename(audio_path)
+    logger.info("Transcribiendo audio: %s", audio_file)
+    
     try:
-        logger.info(f"Enviando audio a OpenAI para transcripción: {os.path.basename(audio_path)}")
-        with open(audio_path, "rb") as audio_file:
-            response = openai.Audio.transcribe(
-                model="whisper-1",
-                file=audio_file,
-                response_format="text"
-            )
-        return response
+        # Transcribir
+        transcription = await transcribe_audio(audio_path, semaphore)
+        
+        if transcription:
+            # Guardar transcripción
+            with open(transcript_path, "w", encoding="utf-8") as f:
+                f.write(transcription)
+            logger.info("Transcripción guardada: %s", os.path.basename(transcript_path))
+            return True
+        
+        logger.error("La transcripción para %s falló o está vacía", audio_file)
+        return False
     except Exception as e:
-        logger.error(f"Error al transcribir audio: {str(e)}")
-        return None
+        logger.error("Error procesando %s: %s", audio_file, e)
+        logger.error(traceback.format_exc())
+        return False
 
-def transcribe_files():
+async def transcribe_files():
     """Paso 3: Transcribe los archivos de audio"""
     logger.info("=== PASO 3: TRANSCRIPCIÓN DE AUDIO ===")
     
     # Obtener archivos de audio
-    audio_files = [f for f in os.listdir(DIRS["audio"]) if f.endswith('.mp3')]
+    audio_files = list(iter_media(DIRS["audio"], ('.mp3',)))
     
     if not audio_files:
         logger.info("No hay archivos de audio para transcribir")
         return
     
-    logger.info(f"Encontrados {len(audio_files)} archivos de audio")
+    logger.info("Encontrados %s archivos de audio", len(audio_files))
     
     # Contadores
-    processed = 0
-    failed = 0
     skipped = 0
     
-    # Procesar cada archivo
-    for audio_file in audio_files:
-        audio_path = os.path.join(DIRS["audio"], audio_file)
+    # Preparar las transcripciones pendientes
+    transcribed = existing_stems(DIRS["transcripts"], ".txt")
+    semaphore = asyncio.Semaphore(TRANSCRIPTION_CONCURRENCY)
+    tasks = []
+    for entry in audio_files:
+        audio_file = entry.name
         base_name = os.path.splitext(audio_file)[0]
         transcript_path = os.path.join(DIRS["transcripts"], f"{base_name}.txt")
         
         # Verificar si ya existe
-        if os.path.exists(transcript_path):
-            logger.info(f"Omitiendo (ya transcrito): {audio_file}")
+        if base_name in transcribed:
+            logger.info("Omitiendo (ya transcrito): %s", audio_file)
             skipped += 1
             continue
         
-        logger.info(f"Transcribiendo audio: {audio_file}")
-        
+        tasks.append(transcribe_file(entry.path, transcript_path, semaphore))
+    
+    # Enviar todas las transcripciones a la vez; el semáforo limita las que están en vuelo
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    processed = sum(1 for result in results if result is True)
+    failed = len(results) - processed
+    
+    logger.info("Transcripción completa: %s procesados, %s fallidos, %s omitidos", processed, failed, skipped)
+
+def load_summary_prompt(prompt_path="summary_prompt.txt"):
+    """Carga el prompt para resúmenes, o uno por defecto si no existe el archivo"""
+    if os.path.exists(prompt_path):
+        with open(prompt_path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    return "Resume el siguiente texto en un máximo de 3 párrafos conservando las ideas principales:"
+
+# El prompt se lee una sola vez, no en cada resumen
+SUMMARY_PROMPT = load_summary_prompt()
+
+async def generate_summary(text, semaphore):
+    """Genera un resumen usando la API de OpenAI"""
+    async with semaphore:
         try:
-            # Transcribir
-            transcription = transcribe_audio(audio_path)
+            # Llamar a la API
+            response = await openai.ChatCompletion.acreate(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": text}
+                ],
+                max_tokens=1000,
+                temperature=0.7
+            )
             
-            if transcription:
-                # Guardar transcripción
-                with open(transcript_path, "w", encoding="utf-8") as f:
-                    f.write(transcription)
-                logger.info(f"Transcripción guardada: {os.path.basename(transcript_path)}")
-                processed += 1
-            else:
-                logger.error(f"La transcripción para {audio_file} falló o está vacía")
-                failed += 1
+            return response.choices[0].message.content.strip()
         except Exception as e:
-            logger.error(f"Error procesando {audio_file}: {str(e)}")
-            logger.error(traceback.format_exc())
-            failed += 1
-    
-    logger.info(f"Transcripción completa: {processed} procesados, {failed} fallidos, {skipped} omitidos")
+            logger.error("Error al generar resumen: %s", e)
+            return None
 
-def generate_summary(text):
-    """Genera un resumen usando la API de OpenAI"""
+async def summarize_file(transcript_path, summary_path, semaphore):
+    """Resume una transcripción y guarda el resultado; retorna si tuvo éxito"""
+    transcript_file = os.path.basename(transcript_path)
+    logger.info("Generando resumen para: %s", transcript_file)
+    
     try:
-        # Cargar el prompt para resúmenes
-        prompt_path = "summary_prompt.txt"
-        if os.path.exists(prompt_path):
-            with open(prompt_path, 'r', encoding='utf-8') as f:
-                prompt = f.read().strip()
-        else:
-            prompt = "Resume el siguiente texto en un máximo de 3 párrafos conservando las ideas principales:"
+        # Leer transcripción
+        text = Path(transcript_path).read_text(encoding='utf-8')
         
-        # Llamar a la API
-        response = openai.Completion.create(
-            engine="text-davinci-003",
-            prompt=f"{prompt}\n\n{text}",
-            max_tokens=1000,
-            temperature=0.7
-        )
+        # Verificar longitud
+        if len(text) < 10:
+            logger.warning("Texto demasiado corto para resumir: %s", transcript_file)
+            return False
+        
+        # Generar resumen
+        summary = await generate_summary(text, semaphore)
         
-        return response.choices[0].text.strip()
+        if summary:
+            # Guardar resumen
+            with open(summary_path, 'w', encoding='utf-8') as f:
+                f.write(summary)
+            logger.info("Resumen guardado: %s", os.path.basename(summary_path))
+            return True
+        
+        logger.error("No se pudo generar resumen para: %s", transcript_file)
+        return False
     except Exception as e:
-        logger.error(f"Error al generar resumen: {str(e)}")
-        return None
+        logger.error("Error procesando %s: %s", transcript_file, e)
+        logger.error(traceback.format_exc())
+        return False
 
-def generate_summaries():
+async def generate_summaries():
     """Paso 4: Genera resúmenes de las transcripciones"""
     logger.info("=== PASO 4: GENERACIÓN DE RESÚMENES ===")
     
     # Obtener archivos de transcripción
-    transcript_files = [f for f in os.listdir(DIRS["transcripts"]) if f.endswith('.txt')]
+    transcript_files = list(iter_media(DIRS["transcripts"], ('.txt',)))
     
     if not transcript_files:
         logger.info("No hay transcripciones para resumir")
         return
     
-    logger.info(f"Encontradas {len(transcript_files)} transcripciones")
+    logger.info("Encontradas %s transcripciones", len(transcript_files))
     
     # Contadores
-    processed = 0
-    failed = 0
     skipped = 0
     
-    # Procesar cada archivo
-    for transcript_file in transcript_files:
-        transcript_path = os.path.join(DIRS["transcripts"], transcript_file)
+    # Preparar los resúmenes pendientes
+    summarized = existing_stems(DIRS["summaries"], ".txt")
+    semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+    tasks = []
+    for entry in transcript_files:
+        transcript_file = entry.name
         summary_path = os.path.join(DIRS["summaries"], transcript_file)
         
         # Verificar si ya existe
-        if os.path.exists(summary_path):
-            logger.info(f"Omitiendo (ya resumido): {transcript_file}")
+        if os.path.splitext(transcript_file)[0] in summarized:
+            logger.info("Omitiendo (ya resumido): %s", transcript_file)
             skipped += 1
             continue
         
-        logger.info(f"Generando resumen para: {transcript_file}")
-        
-        try:
-            # Leer transcripción
-            with open(transcript_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-            
-            # Verificar longitud
-            if len(text) < 10:
-                logger.warning(f"Texto demasiado corto para resumir: {transcript_file}")
-                failed += 1
-                continue
-            
-            # Generar resumen
-            summary = generate_summary(text)
-            
-            if summary:
-                # Guardar resumen
-                with open(summary_path, 'w', encoding='utf-8') as f:
-                    f.write(summary)
-                logger.info(f"Resumen guardado: {os.path.basename(summary_path)}")
-                processed += 1
-            else:
-                logger.error(f"No se pudo generar resumen para: {transcript_file}")
-                failed += 1
-        except Exception as e:
-            logger.error(f"Error procesando {transcript_file}: {str(e)}")
-            logger.error(traceback.format_exc())
-            failed += 1
+        tasks.append(summarize_file(entry.path, summary_path, semaphore))
     
-    logger.info(f"Generación de resúmenes completa: {processed} procesados, {failed} fallidos, {skipped} omitidos")
+    # Enviar todos los resúmenes a la vez; el semáforo limita los que están en vuelo
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    processed = sum(1 for result in results if result is True)
+    failed = len(results) - processed
+    
+    logger.info("Generación de resúmenes completa: %s procesados, %s fallidos, %s omitidos", processed, failed, skipped)
 
 async def main():
     """Ejecuta todo el pipeline de procesamiento"""
@@ -289,18 +356,24 @@ async def main():
         # Paso 2: Convertir videos a audio
         convert_videos_to_audio()
         
-        # Paso 3: Transcribir audio
-        transcribe_files()
-        
-        # Paso 4: Generar resúmenes
-        generate_summaries()
+        # Una sola sesión HTTP para todas las llamadas a OpenAI: las conexiones
+        # (TCP + TLS) se reutilizan en vez de abrir una nueva por petición
+        connector = aiohttp.TCPConnector(limit=OPENAI_MAX_CONNECTIONS)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            openai.aiosession.set(session)
+            
+            # Paso 3: Transcribir audio
+            await transcribe_files()
+            
+            # Paso 4: Generar resúmenes
+            await generate_summaries()
         
     except Exception as e:
-        logger.error(f"Error en el pipeline: {str(e)}")
+        logger.error("Error en el pipeline: %s", e)
         logger.error(traceback.format_exc())
     
     elapsed_time = time.time() - start_time
-    logger.info(f"=== PIPELINE COMPLETO FINALIZADO en {elapsed_time:.2f} segundos ===")
+    logger.info("=== PIPELINE COMPLETO FINALIZADO en %.2f segundos ===", elapsed_time)
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
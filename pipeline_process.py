@@ -1,35 +1,48 @@
 import os
 import logging
+import logging.handlers
 import time
 import sys
 import traceback
 import dotenv
+from pathlib import Path
 from summarize import Summarizer
+from utils.files import existing_stems, iter_media
 
 # Cargar variables de entorno
 dotenv.load_dotenv()
 
 # Configuración de logging
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# El archivo de log recibe los registros en bloques de 1000 (o de inmediato ante
+# un ERROR) en vez de una escritura por línea; al salir, logging vacía el resto
+log_file_handler = logging.FileHandler('pipeline.log')
+log_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
         logging.StreamHandler(sys.stdout),
-        logging.FileHandler('pipeline.log')
+        logging.handlers.MemoryHandler(
+            capacity=1000,
+            flushLevel=logging.ERROR,
+            target=log_file_handler
+        )
     ]
 )
 logger = logging.getLogger(__name__)
 
-def already_processed(source_file, target_dir, target_ext=".txt"):
-    """Verifica si un archivo ya ha sido procesado (existe en el directorio destino)"""
-    base_name = os.path.splitext(os.path.basename(source_file))[0]
-    target_file = os.path.join(target_dir, f"{base_name}{target_ext}")
-    return os.path.exists(target_file)
+def ensure_directories():
+    """Asegura que existan todos los directorios del pipeline (una sola vez al inicio)"""
+    for directory in ("Transcript", "Transcripciones", "Resumenes"):
+        os.makedirs(directory, exist_ok=True)
 
 def dummy_transcribe_audio(audio_path):
     """Función de simulación de transcripción para pruebas"""
     # En producción aquí se llamaría a la API de OpenAI
-    logger.info(f"Simulando transcripción de: {audio_path}")
+    logger.info("Simulando transcripción de: %s", audio_path)
     base_name = os.path.splitext(os.path.basename(audio_path))[0]
     return f"Transcripción simulada para {base_name}. Este es un texto de prueba para simular una transcripción real. Se puede utilizar para verificar el flujo de trabajo sin necesidad de usar la API de OpenAI. En un entorno de producción, esta función sería reemplazada por la llamada real a la API que devolvería el texto transcrito del audio o video proporcionado."
 
@@ -37,37 +50,37 @@ def process_transcription():
     """Procesa todos los archivos de audio que no han sido transcritos aún"""
     logger.info("=== INICIANDO PROCESO DE TRANSCRIPCIÓN ===")
     
-    # Verificar que existan los directorios
-    os.makedirs("Transcript", exist_ok=True)
-    os.makedirs("Transcripciones", exist_ok=True)
-    
     # Obtener archivos de audio
-    audio_files = [f for f in os.listdir("Transcript") if f.endswith(('.mp3', '.wav', '.m4a'))]
+    audio_files = list(iter_media("Transcript", ('.mp3', '.wav', '.m4a')))
     
     if not audio_files:
         logger.info("No hay archivos de audio para transcribir")
         return
     
-    logger.info(f"Encontrados {len(audio_files)} archivos de audio")
+    logger.info("Encontrados %s archivos de audio", len(audio_files))
     
     # Contador de procesados
     processed = 0
     failed = 0
     skipped = 0
     
+    # Transcripciones existentes, leídas una sola vez
+    transcribed = existing_stems("Transcripciones", ".txt")
+    
     # Procesar cada archivo
-    for audio_file in audio_files:
-        audio_path = os.path.join("Transcript", audio_file)
+    for entry in audio_files:
+        audio_file = entry.name
+        audio_path = entry.path
         base_name = os.path.splitext(audio_file)[0]
         output_path = os.path.join("Transcripciones", f"{base_name}.txt")
         
         # Verificar si ya existe
-        if already_processed(audio_file, "Transcripciones"):
-            logger.info(f"Omitiendo (ya procesado): {audio_file}")
+        if base_name in transcribed:
+            logger.info("Omitiendo (ya procesado): %s", audio_file)
             skipped += 1
             continue
         
-        logger.info(f"Transcribiendo: {audio_file}")
+        logger.info("Transcribiendo: %s", audio_file)
         
         try:
             # Usar transcripción simulada para pruebas
@@ -77,64 +90,63 @@ def process_transcription():
                 # Guardar transcripción
                 with open(output_path, "w", encoding="utf-8") as f:
                     f.write(transcription)
-                logger.info(f"Transcripción guardada en: {output_path}")
+                logger.info("Transcripción guardada en: %s", output_path)
                 processed += 1
             else:
-                logger.error(f"Error al transcribir {audio_file}")
+                logger.error("Error al transcribir %s", audio_file)
                 failed += 1
         except Exception as e:
-            logger.error(f"Error procesando {audio_file}: {str(e)}")
+            logger.error("Error procesando %s: %s", audio_file, e)
             logger.error(traceback.format_exc())
             failed += 1
     
-    logger.info(f"Transcripción completa: {processed} procesados, {failed} fallidos, {skipped} omitidos")
+    logger.info("Transcripción completa: %s procesados, %s fallidos, %s omitidos", processed, failed, skipped)
     return processed > 0  # Retorna True si se procesó al menos un archivo
 
 def dummy_generate_summary(text):
     """Función de simulación de resumen para pruebas"""
     # En producción aquí se llamaría a la API de OpenAI
-    logger.info(f"Simulando generación de resumen para texto de {len(text)} caracteres")
+    logger.info("Simulando generación de resumen para texto de %s caracteres", len(text))
     return f"Resumen simulado: {text[:100]}... [Texto resumido de {len(text)} caracteres]"
 
 def process_summarization():
     """Procesa todos los archivos de transcripción que no han sido resumidos aún"""
     logger.info("=== INICIANDO PROCESO DE RESUMEN ===")
     
-    # Verificar que existan los directorios
-    os.makedirs("Transcripciones", exist_ok=True)
-    os.makedirs("Resumenes", exist_ok=True)
-    
     # Obtener archivos de transcripción
-    transcript_files = [f for f in os.listdir("Transcripciones") if f.endswith('.txt')]
+    transcript_files = list(iter_media("Transcripciones", ('.txt',)))
     
     if not transcript_files:
         logger.info("No hay archivos de transcripción para resumir")
         return
     
-    logger.info(f"Encontrados {len(transcript_files)} archivos de transcripción")
+    logger.info("Encontrados %s archivos de transcripción", len(transcript_files))
     
     # Contador de procesados
     processed = 0
     failed = 0
     skipped = 0
     
+    # Resúmenes existentes, leídos una sola vez
+    summarized = existing_stems("Resumenes", ".txt")
+    
     # Procesar cada archivo
-    for transcript_file in transcript_files:
-        input_path = os.path.join("Transcripciones", transcript_file)
+    for entry in transcript_files:
+        transcript_file = entry.name
+        input_path = entry.path
         output_path = os.path.join("Resumenes", transcript_file)
         
         # Verificar si ya existe
-        if already_processed(transcript_file, "Resumenes"):
-            logger.info(f"Omitiendo (ya procesado): {transcript_file}")
+        if os.path.splitext(transcript_file)[0] in summarized:
+            logger.info("Omitiendo (ya procesado): %s", transcript_file)
             skipped += 1
             continue
         
-        logger.info(f"Resumiendo: {transcript_file}")
+        logger.info("Resumiendo: %s", transcript_file)
         
         try:
             # Leer el archivo
-            with open(input_path, "r", encoding="utf-8") as f:
-                text = f.read()
+            text = Path(input_path).read_text(encoding="utf-8")
             
             # Usar resumen simulado para pruebas
             final_summary = dummy_generate_summary(text)
@@ -143,21 +155,24 @@ def process_summarization():
             with open(output_path, "w", encoding="utf-8") as f:
                 f.write(final_summary)
             
-            logger.info(f"Resumen guardado en: {output_path}")
+            logger.info("Resumen guardado en: %s", output_path)
             processed += 1
             
         except Exception as e:
-            logger.error(f"Error procesando {transcript_file}: {str(e)}")
+            logger.error("Error procesando %s: %s", transcript_file, e)
             logger.error(traceback.format_exc())
             failed += 1
     
-    logger.info(f"Resumen completo: {processed} procesados, {failed} fallidos, {skipped} omitidos")
+    logger.info("Resumen completo: %s procesados, %s fallidos, %s omitidos", processed, failed, skipped)
 
 def main():
     """Función principal que ejecuta el pipeline completo"""
     start_time = time.time()
     logger.info("=== INICIANDO PIPELINE DE PROCESAMIENTO ===")
     
+    # Crear los directorios una sola vez
+    ensure_directories()
+    
     # Primero transcribir todos los archivos
     process_transcription()
     
@@ -165,7 +180,7 @@ def main():
     process_summarization()
     
     elapsed_time = time.time() - start_time
-    logger.info(f"=== PIPELINE COMPLETADO en {elapsed_time:.2f} segundos ===")
+    logger.info("=== PIPELINE COMPLETADO en %.2f segundos ===", elapsed_time)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
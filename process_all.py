@@ -1,13 +1,17 @@
 import os
 import asyncio
+import hashlib
 import logging
-from datetime import datetime
-from typing import List, Optional
+import random
+import string
+import time
+from typing import List, Optional, Tuple
+import aiohttp
 import openai
 from dotenv import load_dotenv
-from moviepy.editor import VideoFileClip
-from pydub import AudioSegment
-import yaml
+from utils.config import load_config
+from utils.ffmpeg import copy_audio_async, extract_audio_async, probe_audio_codec_async
+from utils.files import existing_stems, iter_media
 
 # Cargar variables de entorno
 load_dotenv()
@@ -20,19 +24,101 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ffmpeg usa CPU: un proceso por núcleo. Las llamadas a OpenAI se limitan aparte
+# para no superar la cuota por minuto y evitar tormentas de errores 429
+MAX_FFMPEG = os.cpu_count() or 1
+MAX_OPENAI = 8
+OPENAI_MAX_CONNECTIONS = 64
+
+# Mensaje de sistema fijo: idéntico en cada petición de resumen
+SUMMARY_SYSTEM_MESSAGE = {"role": "system", "content": "You are a helpful assistant that creates concise summaries."}
+
+# Errores transitorios de OpenAI que vale la pena reintentar
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.APIError,
+    openai.error.Timeout,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+)
+
+async def _retry(coro_factory, max_retries: int = 5, base: float = 1.0, cap: float = 60.0):
+    """Ejecuta coro_factory() reintentando errores transitorios con backoff exponencial y jitter"""
+    for attempt in range(max_retries + 1):
+        try:
+            return await coro_factory()
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            # Respetar Retry-After cuando la API lo indica
+            headers = getattr(e, 'headers', None) or {}
+            retry_after = headers.get('retry-after') or headers.get('Retry-After')
+            try:
+                delay = min(float(retry_after), cap)
+            except (TypeError, ValueError):
+                delay = min(base * 2 ** attempt + random.random() * 0.5, cap)
+            logger.warning(f"OpenAI error ({type(e).__name__}), retrying in {delay:.1f}s "
+                           f"(attempt {attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
+
+def _sha256_file(path: str) -> str:
+    """Calcula el SHA-256 de un archivo leyéndolo en bloques de 64 KB"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _split_prompt(template: str) -> Tuple[str, str]:
+    """Parte la plantilla en el texto de antes y de después de {transcript}"""
+    # Se valida igual que str.format: la plantilla debe tener exactamente un
+    # {transcript} sin conversión ni formato y ningún otro campo. Así
+    # pre + transcripción + post da lo mismo que template.format(transcript=...)
+    parts = ([], [])
+    fields = 0
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        parts[min(fields, 1)].append(literal)
+        if field is None:
+            continue
+        if field != 'transcript' or spec or conversion:
+            raise ValueError(f"Unsupported field in prompt template: {{{field}}}")
+        fields += 1
+    if fields != 1:
+        raise ValueError(f"Prompt template must contain {{transcript}} exactly once, found {fields}")
+    return ''.join(parts[0]), ''.join(parts[1])
+
 class MediaProcessor:
     def __init__(self):
         self.config = self._load_config()
+        # La plantilla del prompt se lee una sola vez, no por cada transcripción,
+        # y se parte en lo que va antes y después de {transcript} para armar cada
+        # prompt con una concatenación en vez de reinterpretar el formato.
+        # Sin prompt.txt solo fallan los resúmenes; el resto del proceso sigue
+        self._prompt_template = self._load_prompt()
+        if self._prompt_template is not None:
+            self._prompt_pre, self._prompt_post = _split_prompt(self._prompt_template)
         self.downloads_dir = "Descargas"
         self.transcripts_dir = "Transcripciones"
         self.summaries_dir = "Resumenes"
+        cache_config = self.config.get('cache') or {}
+        self.cache_enabled = cache_config.get('enabled', True)
+        self.cache_dir = cache_config.get('dir', 'Cache')
+        self.cache_expiry_days = cache_config.get('expiry_days', 30)
         self._ensure_directories()
+        self._ff_sem = asyncio.Semaphore(MAX_FFMPEG)
+        self._api_sem = asyncio.Semaphore(MAX_OPENAI)
+        # Nombres (sin extensión) de los archivos ya presentes por directorio,
+        # leídos una vez en process_directory; vacío = consultar el disco
+        self._existing = {}
     
     def _load_config(self) -> dict:
         """Carga la configuración desde config.yaml"""
         try:
-            with open("config.yaml", 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+            return load_config("config.yaml")
         except Exception as e:
             logger.error(f"Error loading config: {str(e)}")
             return {
@@ -45,31 +131,101 @@ class MediaProcessor:
                 }
             }
     
+    def _load_prompt(self) -> Optional[str]:
+        """Lee la plantilla de prompt.txt, o None si no existe"""
+        try:
+            with open('prompt.txt', 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            logger.warning("prompt.txt not found; transcripts will not be summarized")
+            return None
+    
     def _ensure_directories(self):
         """Asegura que existan los directorios necesarios"""
         for directory in [self.downloads_dir, self.transcripts_dir, self.summaries_dir]:
             os.makedirs(directory, exist_ok=True)
+        if self.cache_enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
     
-    def _extract_audio(self, video_path: str) -> str:
+    def _cache_path(self, key: str, kind: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{kind}.txt")
+    
+    def _cache_get(self, key: str, kind: str) -> Optional[str]:
+        """Devuelve el resultado cacheado para key, o None si no existe o caducó"""
+        if not self.cache_enabled:
+            return None
+        path = self._cache_path(key, kind)
+        try:
+            if self.cache_expiry_days and time.time() - os.path.getmtime(path) > self.cache_expiry_days * 86400:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    
+    def _cache_put(self, key: str, kind: str, text: str):
+        """Guarda un resultado en la caché (escritura atómica)"""
+        if not self.cache_enabled:
+            return
+        path = self._cache_path(key, kind)
+        with open(path + '.part', 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(path + '.part', path)
+    
+    def _exists(self, path: str) -> bool:
+        """Comprueba si path existe, usando el listado previo de su directorio si lo hay"""
+        directory, filename = os.path.split(path)
+        stems = self._existing.get(directory)
+        if stems is None:
+            return os.path.exists(path)
+        return os.path.splitext(filename)[0] in stems
+    
+    async def _extract_audio(self, video_path: str) -> str:
         """Extrae el audio de un video y lo guarda como MP3"""
         try:
-            video = VideoFileClip(video_path)
             audio_path = os.path.splitext(video_path)[0] + '.mp3'
-            video.audio.write_audiofile(audio_path)
-            video.close()
+            # ffmpeg corre como proceso hijo esperado desde el event loop, sin ocupar hilos
+            async with self._ff_sem:
+                # Si la pista ya es MP3 basta con copiarla; si no (o si la copia
+                # falla) se recodifica solo el audio, sin decodificar el video
+                if await probe_audio_codec_async(video_path) == 'mp3':
+                    try:
+                        await copy_audio_async(video_path, audio_path)
+                        return audio_path
+                    except RuntimeError as e:
+                        logger.warning(f"Stream copy failed for {video_path}, re-encoding: {str(e)}")
+                await extract_audio_async(video_path, audio_path)
             return audio_path
         except Exception as e:
             logger.error(f"Error extracting audio from {video_path}: {str(e)}")
             return None
     
-    async def transcribe_audio(self, audio_path: str) -> Optional[str]:
-        """Transcribe un archivo de audio usando OpenAI Whisper"""
+    async def transcribe_audio(self, audio_path: str) -> Tuple[Optional[str], Optional[str]]:
+        """Transcribe un archivo de audio usando OpenAI Whisper y retorna (ruta, texto)"""
         try:
-            with open(audio_path, "rb") as audio_file:
-                transcript = await openai.Audio.atranscribe(
-                    "whisper-1",
-                    audio_file
-                )
+            # La caché se indexa por el contenido del audio, no por el nombre
+            audio_hash = await asyncio.to_thread(_sha256_file, audio_path) if self.cache_enabled else None
+            text = self._cache_get(audio_hash, 'transcript') if audio_hash else None
+            
+            if text is not None:
+                logger.info(f"Transcription cache hit for {audio_path}")
+            else:
+                # El semáforo se toma en cada intento para no ocuparlo durante la espera
+                async def request():
+                    async with self._api_sem:
+                        # Lectura en un hilo para no bloquear el event loop mientras
+                        # otras transcripciones esperan la red
+                        data = await asyncio.to_thread(_read_bytes, audio_path)
+                        return await openai.Audio.atranscribe_raw(
+                            "whisper-1",
+                            data,
+                            os.path.basename(audio_path)
+                        )
+                
+                transcript = await _retry(request)
+                text = transcript['text']
+                if audio_hash:
+                    self._cache_put(audio_hash, 'transcript', text)
             
             # Guardar transcripción
             transcript_path = os.path.join(
@@ -78,39 +234,53 @@ class MediaProcessor:
             )
             
             with open(transcript_path, 'w', encoding='utf-8') as f:
-                f.write(transcript['text'])
+                f.write(text)
             
             logger.info(f"Transcription saved to {transcript_path}")
-            return transcript_path
+            return transcript_path, text
             
         except Exception as e:
             logger.error(f"Error transcribing {audio_path}: {str(e)}")
-            return None
+            return None, None
     
-    async def summarize_transcript(self, transcript_path: str) -> Optional[str]:
+    async def summarize_transcript(self, transcript_path: str, transcript_text: Optional[str] = None) -> Optional[str]:
         """Resume una transcripción usando OpenAI GPT"""
         try:
-            # Leer transcripción
-            with open(transcript_path, 'r', encoding='utf-8') as f:
-                transcript_text = f.read()
-            
-            # Leer prompt
-            with open('prompt.txt', 'r', encoding='utf-8') as f:
-                prompt_template = f.read()
+            # Leer transcripción, salvo que venga en memoria de transcribe_audio
+            if transcript_text is None:
+                with open(transcript_path, 'r', encoding='utf-8') as f:
+                    transcript_text = f.read()
             
             # Crear prompt completo
-            prompt = prompt_template.format(transcript=transcript_text)
+            if self._prompt_template is None:
+                raise FileNotFoundError("prompt.txt not found")
+            prompt = self._prompt_pre + transcript_text + self._prompt_post
             
-            # Generar resumen
-            response = await openai.ChatCompletion.acreate(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that creates concise summaries."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            # La clave incluye el prompt completo: si cambia la plantilla, se invalida
+            prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+            summary = self._cache_get(prompt_hash, 'summary')
             
-            summary = response.choices[0].message.content
+            if summary is not None:
+                logger.info(f"Summary cache hit for {transcript_path}")
+            else:
+                # Generar resumen
+                async def request():
+                    async with self._api_sem:
+                        return await openai.ChatCompletion.acreate(
+                            model="gpt-3.5-turbo",
+                            # Lo invariable (sistema + inicio de la plantilla) va primero y la
+                            # transcripción al final, para que OpenAI reutilice el prefijo cacheado
+                            messages=[
+                                SUMMARY_SYSTEM_MESSAGE,
+                                {"role": "user", "content": prompt}
+                            ]
+                        )
+                
+                response = await _retry(request)
+                
+                summary = response.choices[0].message.content
+                if summary:
+                    self._cache_put(prompt_hash, 'summary', summary)
             
             # Guardar resumen
             summary_path = os.path.join(
@@ -130,20 +300,35 @@ class MediaProcessor:
     
     async def process_video(self, video_path: str):
         """Procesa un video: extrae audio, transcribe y resume"""
-        logger.info(f"Processing video: {video_path}")
+        base = os.path.splitext(os.path.basename(video_path))[0]
+        audio_path = os.path.splitext(video_path)[0] + '.mp3'
+        transcript_path = os.path.join(self.transcripts_dir, f"{base}_transcript.txt")
+        summary_path = os.path.join(self.summaries_dir, f"{base}_transcript_summary.txt")
         
-        # Extraer audio
-        audio_path = self._extract_audio(video_path)
-        if not audio_path:
+        # Saltar las etapas cuyo resultado ya existe en disco
+        if self._exists(summary_path):
+            logger.info(f"Skipping {video_path} (already summarized)")
             return
         
-        # Transcribir
-        transcript_path = await self.transcribe_audio(audio_path)
-        if not transcript_path:
-            return
+        logger.info(f"Processing video: {video_path}")
         
-        # Resumir
-        summary_path = await self.summarize_transcript(transcript_path)
+        transcript_text = None
+        if not self._exists(transcript_path):
+            # El MP3 solo aparece con su nombre final cuando ffmpeg terminó (se
+            # escribe en .part y se renombra), así que si existe está completo
+            if not self._exists(audio_path):
+                # Extraer audio
+                audio_path = await self._extract_audio(video_path)
+                if not audio_path:
+                    return
+            
+            # Transcribir
+            transcript_path, transcript_text = await self.transcribe_audio(audio_path)
+            if not transcript_path:
+                return
+        
+        # Resumir (el texto recién transcrito se pasa directo, sin releer el archivo)
+        summary_path = await self.summarize_transcript(transcript_path, transcript_text)
         if not summary_path:
             return
         
@@ -152,9 +337,8 @@ class MediaProcessor:
     async def process_directory(self):
         """Procesa todos los videos en el directorio de descargas"""
         video_files = [
-            os.path.join(self.downloads_dir, f) 
-            for f in os.listdir(self.downloads_dir) 
-            if f.endswith(('.mp4', '.webm', '.mkv'))
+            entry.path
+            for entry in iter_media(self.downloads_dir, ('.mp4', '.webm', '.mkv'))
         ]
         
         if not video_files:
@@ -163,9 +347,22 @@ class MediaProcessor:
         
         logger.info(f"Found {len(video_files)} video files to process")
         
-        # Procesar videos en paralelo
-        tasks = [self.process_video(video) for video in video_files]
-        await asyncio.gather(*tasks)
+        # Un listado por directorio en vez de hasta tres stat por video
+        self._existing = {
+            self.summaries_dir: existing_stems(self.summaries_dir, '.txt'),
+            self.transcripts_dir: existing_stems(self.transcripts_dir, '.txt'),
+            self.downloads_dir: existing_stems(self.downloads_dir, '.mp3'),
+        }
+        
+        # Una sola sesión HTTP para todas las llamadas a OpenAI: las conexiones
+        # (TCP + TLS) se reutilizan en vez de abrir una nueva por petición
+        connector = aiohttp.TCPConnector(limit=OPENAI_MAX_CONNECTIONS)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            openai.aiosession.set(session)
+            
+            # Procesar videos en paralelo
+            tasks = [self.process_video(video) for video in video_files]
+            await asyncio.gather(*tasks)
         
         logger.info("Completed processing all videos")
 
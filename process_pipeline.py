@@ -1,6 +1,8 @@
 import asyncio
 import logging
 import os
+import aiohttp
+import openai
 from utils.downloader import YoutubeDownloader
 from utils.audio_converter import AudioConverter
 from utils.transcriber import Transcriber
@@ -22,6 +24,12 @@ DIRS = {
     'summaries': 'summaries'
 }
 
+# Videos procesados a la vez (descarga, conversión, transcripción y resumen)
+MAX_CONCURRENT_VIDEOS = int(os.getenv('MAX_CONCURRENT_VIDEOS', '4'))
+
+# Conexiones HTTP abiertas a la vez hacia OpenAI
+OPENAI_MAX_CONNECTIONS = 64
+
 # Emojis para el informe
 EMOJIS = {
     'success': '✅',
@@ -67,9 +75,20 @@ class Pipeline:
             result['download'] = {'status': 'success', 'file': video_file}
             result['title'] = video_title
             
+            # Videos completados en una ejecución anterior: con la caché de descargas
+            # basta con comprobar que el resumen existe, sin tocar ffmpeg ni la API
+            base_name = os.path.splitext(os.path.basename(video_file))[0]
+            summary_file = os.path.join(DIRS['summaries'], f"{base_name}_summary.txt")
+            if os.path.exists(summary_file):
+                logger.info(f"{EMOJIS['skip']} Ya procesado: {url}")
+                result['convert'] = {'status': 'success', 'file': os.path.join(DIRS['audio'], f"{base_name}.mp3")}
+                result['transcribe'] = {'status': 'success', 'file': os.path.join(DIRS['transcripts'], f"{base_name}.txt")}
+                result['summarize'] = {'status': 'success', 'file': summary_file}
+                return result
+            
             # 2. Convertir a audio
             logger.info(f"{EMOJIS['convert']} Convirtiendo {video_file}")
-            if self.converter.convert_to_mp3(video_file):
+            if await self.converter.convert_to_mp3_async(video_file):
                 audio_file = os.path.join(DIRS['audio'], os.path.splitext(os.path.basename(video_file))[0] + '.mp3')
                 result['convert'] = {'status': 'success', 'file': audio_file}
             else:
@@ -78,16 +97,16 @@ class Pipeline:
             
             # 3. Transcribir
             logger.info(f"{EMOJIS['transcribe']} Transcribiendo {audio_file}")
-            success, transcript_file = self.transcriber.transcribe_audio(audio_file)
+            # El transcriptor es síncrono: se ejecuta en un hilo para no frenar a los demás videos
+            success, transcript_file, text = await asyncio.to_thread(self.transcriber.transcribe_audio, audio_file)
             if not success:
                 result['transcribe']['status'] = 'error'
                 return result
             result['transcribe'] = {'status': 'success', 'file': transcript_file}
             
             # 4. Resumir
+            # El texto llega directamente del transcriptor, sin releer el archivo
             logger.info(f"{EMOJIS['summarize']} Generando resumen de {transcript_file}")
-            with open(transcript_file, 'r', encoding='utf-8') as f:
-                text = f.read()
             summary = await self.summarizer.generate_summary(text, os.path.basename(transcript_file))
             if summary:
                 result['summarize'] = {'status': 'success', 'file': os.path.join(DIRS['summaries'], os.path.splitext(os.path.basename(transcript_file))[0] + '_summary.txt')}
@@ -99,12 +118,24 @@ class Pipeline:
             
         return result
 
+    async def process_urls(self, urls: list, max_concurrent: int = MAX_CONCURRENT_VIDEOS) -> list:
+        """Procesa varios videos en paralelo (hasta max_concurrent a la vez) y retorna los resultados en orden"""
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        async def bounded(url):
+            async with semaphore:
+                return await self.process_video(url)
+                
+        return await asyncio.gather(*(bounded(url) for url in urls))
+
     def print_report(self, results: list):
         """Imprime un informe formateado de los resultados"""
         print("\n" + "="*50)
         print("📊 INFORME DE PROCESAMIENTO")
         print("="*50 + "\n")
         
+        # Los totales se cuentan en la misma pasada que imprime cada video
+        success = partial = 0
         for result in results:
             print(f"🎥 Video: {result['url']}")
             if 'title' in result:
@@ -118,12 +149,19 @@ class Pipeline:
                 'summarize': ('📋 Resumen', result.get('summarize', {}).get('file'))
             }
             
+            completed = 0
             for stage_name, (label, file) in stages.items():
                 status = result.get(stage_name, {}).get('status', 'error')
+                completed += status == 'success'
                 status_emoji = EMOJIS['success'] if status == 'success' else EMOJIS['error']
                 file_path = file or 'N/A'
                 print(f"{label}: {status_emoji} {file_path}")
             
+            if completed == len(stages):
+                success += 1
+            elif completed:
+                partial += 1
+            
             print()  # Línea en blanco entre videos
         
         # Resumen del proceso
@@ -132,8 +170,6 @@ class Pipeline:
         print("="*50)
         
         total = len(results)
-        success = sum(1 for r in results if all(r.get(s, {}).get('status') == 'success' for s in ['download', 'convert', 'transcribe', 'summarize']))
-        partial = sum(1 for r in results if any(r.get(s, {}).get('status') == 'success' for s in ['download', 'convert', 'transcribe', 'summarize'])) - success
         failed = total - success - partial
         
         print(f"\n🎯 Total de videos procesados: {total}")
@@ -145,17 +181,20 @@ class Pipeline:
 
 async def main():
     pipeline = Pipeline()
-    results = []
     
     # Leer URLs del archivo
-    with open('test_urls.txt', 'r') as f:
-        urls = [line.strip() for line in f if line.strip()]
+    # Una sola lectura y un strip por línea
+    with open('test_urls.txt', 'r', encoding='utf-8') as f:
+        urls = [url for url in map(str.strip, f.read().splitlines()) if url]
     
     logger.info(f"{EMOJIS['process']} Iniciando procesamiento de {len(urls)} videos")
     
-    for url in urls:
-        result = await pipeline.process_video(url)
-        results.append(result)
+    # Una sola sesión HTTP para todos los resúmenes: las conexiones (TCP + TLS)
+    # se reutilizan en vez de abrir una nueva por petición
+    connector = aiohttp.TCPConnector(limit=OPENAI_MAX_CONNECTIONS)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        openai.aiosession.set(session)
+        results = await pipeline.process_urls(urls)
     
     pipeline.print_report(results)
 
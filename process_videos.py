@@ -2,15 +2,20 @@ import os
 import sys
 import time
 import logging
+import logging.handlers
+import queue
+import atexit
 import traceback
 import asyncio
 from typing import Dict, List, Set
 from dotenv import load_dotenv
+import aiohttp
 import openai
 from utils.downloader import YoutubeDownloader
 from utils.audio_converter import AudioConverter
 from utils.transcriber import Transcriber
 from utils.summarizer import Summarizer
+from utils.files import existing_stems, iter_media
 
 # Configure logging
 def setup_logging():
@@ -43,13 +48,36 @@ def setup_logging():
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(detailed_formatter)
 
+    # File handlers write in blocks of 1000 records (or at once on an ERROR)
+    # instead of a write and flush per record; logging flushes the rest at exit
+    def buffered(handler):
+        memory_handler = logging.handlers.MemoryHandler(
+            capacity=1000,
+            flushLevel=logging.ERROR,
+            target=handler
+        )
+        # MemoryHandler does not filter by its target's level when flushing
+        memory_handler.setLevel(handler.level)
+        return memory_handler
+
     # Configure root logger
+    # Records go into an in-memory queue; a listener thread writes them to the
+    # files and console, so logging never blocks the pipeline on disk I/O
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        log_queue,
+        buffered(debug_handler),
+        buffered(error_handler),
+        buffered(steps_handler),
+        console_handler,
+        respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.DEBUG)
-    root_logger.addHandler(debug_handler)
-    root_logger.addHandler(error_handler)
-    root_logger.addHandler(steps_handler)
-    root_logger.addHandler(console_handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
 # Set up logging
 setup_logging()
@@ -59,6 +87,22 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 openai.api_key = os.getenv('OPENAI_API_KEY')
 
+# Summarize through the OpenAI Batch API (cheaper, but results may take hours)
+USE_BATCH_API = os.getenv('USE_BATCH_API', '').lower() in ('1', 'true', 'yes')
+
+# Items buffered between pipeline stages, and the marker that ends a stage
+PIPELINE_QUEUE_SIZE = 4
+PIPELINE_DONE = None
+
+# Concurrent ffmpeg conversions, one per core
+CONVERSION_WORKERS = os.cpu_count() or 1
+
+# Concurrent Whisper uploads; keep within the account's API rate limits
+WHISPER_CONCURRENCY = int(os.getenv('WHISPER_CONCURRENCY', '8'))
+
+# Simultaneous HTTP connections to OpenAI
+OPENAI_MAX_CONNECTIONS = 64
+
 # Directory structure
 DIRS = {
     'videos': 'videos',
@@ -76,8 +120,9 @@ for dir_path in DIRS.values():
 # Load YouTube URLs
 YOUTUBE_URLS = []
 try:
-    with open(DIRS['urls'], 'r') as f:
-        YOUTUBE_URLS = [line.strip() for line in f if line.strip()]
+    # One read and a single strip per line
+    with open(DIRS['urls'], 'r', encoding='utf-8') as f:
+        YOUTUBE_URLS = [url for url in map(str.strip, f.read().splitlines()) if url]
 except Exception as e:
     logger.error(f"Failed to load URLs from {DIRS['urls']}: {str(e)}")
 
@@ -90,7 +135,7 @@ summarizer = Summarizer(DIRS['summaries'])
 def get_processed_files(directory: str, extension: str) -> List[str]:
     """Get list of already processed files."""
     try:
-        return [f for f in os.listdir(directory) if f.endswith(extension)]
+        return [entry.name for entry in iter_media(directory, (extension,))]
     except Exception as e:
         logger.error(f"Failed to get processed files from {directory}: {str(e)}")
         return []
@@ -108,64 +153,12 @@ def already_exists(base_name: str, directory: str, extension: str) -> bool:
     target_path = os.path.join(directory, f"{base_name}{extension}")
     return os.path.exists(target_path)
 
-async def process_videos():
-    logger.info("\n=== Starting Pipeline ===\n")
-    
-    # Process downloads
-    logger.info("Downloads:")
-    success_count = 0
-    failure_count = 0
-    skip_count = 0
-    success_files = []
-    failure_files = []
-    
-    for url in YOUTUBE_URLS:
-        try:
-            filename = await downloader.download_url(url)
-            if not filename:
-                logger.error(f"Failed to download {url}")
-                failure_count += 1
-                failure_files.append(url)
-            else:
-                success_count += 1
-                success_files.append(filename)
-        except Exception as e:
-            logger.error(f"Failed to download {url}: {str(e)}")
-            failure_count += 1
-            failure_files.append(url)
-    
-    logger.info(f"  + Success: {success_count}")
-    logger.info(f"  - Failed: {failure_count}")
-    logger.info(f"  > Skipped: {skip_count}")
-    
-    if success_count > 0:
-        logger.info("\n  Successful files:")
-        for file in success_files:
-            logger.info(f"    + {os.path.basename(file)}")
-            
-    if failure_count > 0:
-        logger.info("\n  Failed files:")
-        for file in failure_files:
-            logger.info(f"    - {os.path.basename(file)}")
-            
-    # Process conversions
-    logger.info("\nConversions:")
-    data = process_conversions()
+def log_stage_results(title: str, data: Dict):
+    """Log the success/failed/skipped counts and file lists of a pipeline stage."""
+    logger.info(f"\n{title}:")
     logger.info(f"  + Success: {len(data['success'])}")
     logger.info(f"  - Failed: {len(data['failed'])}")
-    logger.info(f"  > Skipped: {len(data.get('skipped', []))}")
-    
-    if data.get('skipped'):
-        logger.info("\n  Skipped files (already processed):")
-        for file in data['skipped']:
-            logger.info(f"    > {file}")
-            
-    # Process transcriptions
-    logger.info("\nTranscriptions:")
-    data = process_transcriptions()
-    logger.info(f"  + Success: {len(data['success'])}")
-    logger.info(f"  - Failed: {len(data['failed'])}")
-    logger.info(f"  > Skipped: {len(data.get('skipped', []))}")
+    logger.info(f"  > Skipped: {len(data['skipped'])}")
     
     if data['success']:
         logger.info("\n  Successful files:")
@@ -177,95 +170,144 @@ async def process_videos():
         for file in data['failed']:
             logger.info(f"    - {os.path.basename(file)}")
             
-    # Process summaries
-    logger.info("\nSummaries:")
-    data = await process_summaries()
-    logger.info(f"  + Success: {len(data['success'])}")
-    logger.info(f"  - Failed: {len(data['failed'])}")
-    logger.info(f"  > Skipped: {len(data.get('skipped', []))}")
-    
-    if data['success']:
-        logger.info("\n  Successful files:")
-        for file in data['success']:
-            logger.info(f"    + {os.path.basename(file)}")
-            
-    logger.info("\n=== Pipeline Complete! ===\n")
+    if data['skipped']:
+        logger.info("\n  Skipped files (already processed):")
+        for file in data['skipped']:
+            logger.info(f"    > {os.path.basename(file)}")
 
-def process_conversions():
-    logger.info("\nConversions:")
-    success_files = []
-    failure_files = []
-    skipped_files = []
+async def download_stage(convert_q: asyncio.Queue, results: Dict):
+    """Download every URL and feed the videos (plus any left from earlier runs) to the converter."""
+    # Videos downloaded by a previous run still need converting; they are
+    # queued after the downloads so these can start right away. Only finished
+    # videos count: yt-dlp's .part/.ytdl leftovers would just fail in ffmpeg
+    leftovers = {entry.path: None for entry in iter_media(DIRS['videos'], ('.mp4', '.webm', '.mkv'))}
     
-    converter = AudioConverter(DIRS['audio'])
-    
-    for video in os.listdir(DIRS['videos']):
+    for url in YOUTUBE_URLS:
         try:
-            if converter.convert_to_mp3(os.path.join(DIRS['videos'], video)):
-                success_files.append(video)
-            else:
-                skipped_files.append(video)
+            video_path, _ = await downloader.download_url(url)
         except Exception as e:
-            logger.error(f"Failed to convert {video}: {str(e)}")
-            failure_files.append(video)
+            logger.error(f"Failed to download {url}: {str(e)}")
+            results['failed'].append(url)
+            continue
             
-    return {
-        'success': success_files,
-        'failed': failure_files,
-        'skipped': skipped_files
-    }
-
-def process_transcriptions() -> Dict:
-    """Transcribe audio files."""
-    results = {'success': [], 'failed': [], 'skipped': []}
-    transcriber = Transcriber(DIRS['transcripts'])
-    
-    try:
-        audio_files = [f for f in os.listdir(DIRS['audio']) if f.endswith('.mp3')]
+        if not video_path:
+            logger.error(f"Failed to download {url}")
+            results['failed'].append(url)
+            continue
+            
+        results['success'].append(video_path)
+        leftovers.pop(video_path, None)
+        await convert_q.put(video_path)
         
-        for audio in audio_files:
-            audio_path = os.path.join(DIRS['audio'], audio)
+    for video_path in leftovers:
+        await convert_q.put(video_path)
             
-            # Check file size (25MB limit)
-            if os.path.getsize(audio_path) > 25 * 1024 * 1024:
-                logger.error(f"Audio file too large (>25MB): {audio}")
-                results['failed'].append(audio)
-                continue
+    await convert_q.put(PIPELINE_DONE)
+
+async def convert_stage(convert_q: asyncio.Queue, transcribe_q: asyncio.Queue, results: Dict):
+    """Extract the audio of each video and pass it on to transcription, plus any untranscribed audio in the folder."""
+    # Audio with no transcript yet that no video in this run produces (dropped-in
+    # MP3s, or videos deleted after conversion) is queued after the conversions
+    transcribed = existing_stems(DIRS['transcripts'], '.txt')
+    leftovers = {
+        entry.path: None
+        for entry in iter_media(DIRS['audio'], ('.mp3',))
+        if os.path.splitext(entry.name)[0] not in transcribed
+    }
+    
+    async def worker():
+        while True:
+            video_path = await convert_q.get()
+            if video_path is PIPELINE_DONE:
+                # Put the marker back so the other workers stop too
+                await convert_q.put(PIPELINE_DONE)
+                break
+            # ffmpeg runs as an awaited child process, without tying up a thread
+            audio_path = await converter.convert_to_mp3_async(video_path)
                 
-            try:
-                success, transcript_path = transcriber.transcribe_audio(audio_path)
+            if audio_path:
+                results['success'].append(video_path)
+                leftovers.pop(audio_path, None)
+                await transcribe_q.put(audio_path)
+            else:
+                results['failed'].append(video_path)
                 
-                if success:
-                    results['success'].append(audio)
-                else:
-                    results['failed'].append(audio)
-                    logger.error(f"Transcription failed for {audio}")
+    await asyncio.gather(*(worker() for _ in range(CONVERSION_WORKERS)))
+    for audio_path in leftovers:
+        await transcribe_q.put(audio_path)
+    await transcribe_q.put(PIPELINE_DONE)
+
+async def transcribe_stage(transcribe_q: asyncio.Queue, summarize_q: asyncio.Queue, results: Dict):
+    """Transcribe each audio file and pass the transcript on to summarization, plus any unsummarized transcript in the folder."""
+    # Transcripts with no summary yet that this run does not produce again are
+    # queued after the transcriptions; their text is read when summarized
+    summarized = existing_stems(DIRS['summaries'], '.txt')
+    leftovers = {
+        entry.path: None
+        for entry in iter_media(DIRS['transcripts'], ('.txt',))
+        if os.path.splitext(entry.name)[0] + '_summary' not in summarized
+    }
+    
+    async def worker():
+        while True:
+            audio_path = await transcribe_q.get()
+            if audio_path is PIPELINE_DONE:
+                # Put the marker back so the other workers stop too
+                await transcribe_q.put(PIPELINE_DONE)
+                break
+            # Files over the 25MB Whisper limit are split into chunks by the transcriber
+            try:
+                success, transcript_path, text = await asyncio.to_thread(transcriber.transcribe_audio, audio_path)
             except Exception as e:
-                logger.error(f"Failed to transcribe {audio}: {str(e)}")
-                results['failed'].append(audio)
+                logger.error(f"Failed to transcribe {audio_path}: {str(e)}")
+                success, transcript_path, text = False, "", ""
                 
-    except Exception as e:
-        logger.error(f"Error in transcription process: {str(e)}")
-        
-    return results
+            if success:
+                results['success'].append(audio_path)
+                leftovers.pop(transcript_path, None)
+                # The text travels with the path so the summarizer doesn't re-read the file
+                await summarize_q.put((transcript_path, text))
+            else:
+                logger.error(f"Transcription failed for {os.path.basename(audio_path)}")
+                results['failed'].append(audio_path)
+                
+    # Uploads overlap up to the API concurrency budget instead of going one by one
+    await asyncio.gather(*(worker() for _ in range(WHISPER_CONCURRENCY)))
+    for transcript_path in leftovers:
+        await summarize_q.put((transcript_path, None))
+    await summarize_q.put(PIPELINE_DONE)
 
-async def process_summaries() -> Dict:
-    """Generate summaries from transcripts."""
-    results = {'success': [], 'failed': [], 'skipped': []}
-    
-    processed_files = get_processed_files(DIRS['transcripts'], '.txt')
+async def summarize_stage(summarize_q: asyncio.Queue, results: Dict):
+    """Summarize each transcript, or collect them for one Batch API job when USE_BATCH_API is set."""
+    batch_texts = {}
+    # Summaries already on disk, read once instead of a stat per transcript
+    summarized = existing_stems(DIRS['summaries'], '.txt')
     
-    for transcript_file in processed_files:
+    while True:
+        item = await summarize_q.get()
+        if item is PIPELINE_DONE:
+            break
+        transcript_path, text = item
+        transcript_file = os.path.basename(transcript_path)
+        
+        if os.path.splitext(transcript_file)[0] + '_summary' in summarized:
+            results['skipped'].append(transcript_file)
+            continue
+            
         try:
-            # Read transcription
-            transcript_path = os.path.join(DIRS['transcripts'], transcript_file)
-            with open(transcript_path, 'r', encoding='utf-8') as f:
-                text = f.read()
+            if text is None:
+                # Transcript left from an earlier run
+                with open(transcript_path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                
+            if USE_BATCH_API:
+                batch_texts[transcript_file] = text
+                continue
                 
             logger.info(f"Generating summary for {transcript_file}...")
             
             # Generate and save summary
-            summary = await summarizer.generate_summary(text)
+            summary = await summarizer.generate_summary(text, transcript_file)
             if summary:
                 results['success'].append(transcript_file)
             else:
@@ -276,7 +318,51 @@ async def process_summaries() -> Dict:
             logger.error(f"Failed to generate summary for {transcript_file}: {str(e)}")
             results['failed'].append(transcript_file)
             
-    return results
+    if batch_texts:
+        logger.info(f"Submitting {len(batch_texts)} transcripts to the Batch API...")
+        try:
+            summaries = await summarizer.generate_summaries_batch(batch_texts)
+        except Exception as e:
+            logger.error(f"Batch summarization failed: {str(e)}")
+            summaries = {}
+        for transcript_file in batch_texts:
+            if transcript_file in summaries:
+                results['success'].append(transcript_file)
+            else:
+                results['failed'].append(transcript_file)
+
+async def process_videos():
+    logger.info("\n=== Starting Pipeline ===\n")
+    
+    # Each stage runs as its own task and hands items to the next through a
+    # bounded queue, so video K+1 downloads while video K is being converted,
+    # transcribed or summarized instead of waiting for the whole batch
+    results = {
+        stage: {'success': [], 'failed': [], 'skipped': []}
+        for stage in ('downloads', 'conversions', 'transcriptions', 'summaries')
+    }
+    convert_q = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    transcribe_q = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    summarize_q = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    
+    # One HTTP session for every async OpenAI call: connections (TCP + TLS)
+    # are reused instead of opening a new one per summary request
+    connector = aiohttp.TCPConnector(limit=OPENAI_MAX_CONNECTIONS)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        openai.aiosession.set(session)
+        await asyncio.gather(
+            download_stage(convert_q, results['downloads']),
+            convert_stage(convert_q, transcribe_q, results['conversions']),
+            transcribe_stage(transcribe_q, summarize_q, results['transcriptions']),
+            summarize_stage(summarize_q, results['summaries'])
+        )
+    
+    log_stage_results("Downloads", results['downloads'])
+    log_stage_results("Conversions", results['conversions'])
+    log_stage_results("Transcriptions", results['transcriptions'])
+    log_stage_results("Summaries", results['summaries'])
+            
+    logger.info("\n=== Pipeline Complete! ===\n")
 
 def process_transcription(text, output_dir):
     try:
@@ -76,12 +76,16 @@ def summarize_files():
     summarizer = Summarizer()
     
     # Procesar cada archivo en el directorio de transcripciones
-    for filename in os.listdir("Transcripciones"):
-        if filename.endswith(".txt"):
+    # (un solo recorrido; scandir ya trae el tipo de cada entrada)
+    with os.scandir("Transcripciones") as entries:
+        for entry in entries:
+            filename = entry.name
+            if not (entry.is_file() and filename.endswith(".txt")):
+                continue
             logger.info(f"\nProcesando: {filename}")
             
             # Leer el archivo
-            input_path = os.path.join("Transcripciones", filename)
+            input_path = entry.path
             output_path = os.path.join("Resumenes", filename)
             
             try:
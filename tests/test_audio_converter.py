@@ -0,0 +1,50 @@
+import os
+import shutil
+import unittest
+from unittest import mock
+from utils.audio_converter import AudioConverter
+
+class TestAudioConverter(unittest.TestCase):
+    def setUp(self):
+        """Create a scratch output directory"""
+        self.test_dir = "test_audio"
+        self.converter = AudioConverter(self.test_dir)
+
+    def tearDown(self):
+        """Remove the scratch directory"""
+        shutil.rmtree(self.test_dir)
+
+    def _fake_ffmpeg(self, fail=False):
+        """Stand-in for ffmpeg that writes its output file and optionally fails"""
+        def run(args):
+            with open(args[-1], 'wb') as f:
+                f.write(b"ID3")
+            if fail:
+                raise RuntimeError("ffmpeg exited with code 1")
+        return mock.patch('utils.ffmpeg._run', side_effect=run)
+
+    def test_existing_mp3_is_reused(self):
+        """Test that an existing MP3 is not converted again"""
+        output_path = os.path.join(self.test_dir, "video.mp3")
+        with open(output_path, 'wb') as f:
+            f.write(b"ID3")
+        with self._fake_ffmpeg() as run:
+            self.assertEqual(self.converter.convert_to_mp3("videos/video.mp4"), output_path)
+        run.assert_not_called()
+
+    def test_conversion_is_published_on_success(self):
+        """Test that ffmpeg writes to a .part file that is renamed when it finishes"""
+        output_path = os.path.join(self.test_dir, "video.mp3")
+        with self._fake_ffmpeg() as run:
+            self.assertEqual(self.converter.convert_to_mp3("videos/video.mp4"), output_path)
+        self.assertEqual(run.call_args.args[0][-1], output_path + ".part")
+        self.assertEqual(os.listdir(self.test_dir), ["video.mp3"])
+
+    def test_failed_conversion_leaves_no_output(self):
+        """Test that a failed conversion leaves neither the MP3 nor the partial file"""
+        with self._fake_ffmpeg(fail=True):
+            self.assertEqual(self.converter.convert_to_mp3("videos/video.mp4"), "")
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,7 +11,9 @@ class TestDownloader(unittest.TestCase):
         cls.test_dir = "test_downloads"
         cls.test_url = "https://www.youtube.com/watch?v=OZaxtm3RyCw"
         os.makedirs(cls.test_dir, exist_ok=True)
-        cls.downloader = YoutubeDownloader(cls.test_dir)
+        # Keep the download cache out of the real home directory
+        cls.cache_file = os.path.join(cls.test_dir, "downloads.json")
+        cls.downloader = YoutubeDownloader(cls.test_dir, cache_file=cls.cache_file)
 
     def setUp(self):
         """Clean test directory before each test"""
@@ -55,5 +57,20 @@ class TestDownloader(unittest.TestCase):
             self.assertTrue(os.path.exists(filename), f"File {filename} should exist")
             self.assertTrue(os.path.getsize(filename) > 0, f"File {filename} should have content")
 
+    def test_download_from_file_skips_invalid_lines(self):
+        """Test that non-YouTube lines fail without being downloaded"""
+        test_file = os.path.join(self.test_dir, "invalid_urls.txt")
+        with open(test_file, "w") as f:
+            f.write("not a url\n\nhttps://example.com/watch?v=OZaxtm3RyCw\n")
+
+        results = asyncio.run(self.downloader.download_from_file(test_file))
+        self.assertEqual(len(results['success']), 0, "Should have no successful downloads")
+        self.assertEqual(
+            [url for url, _ in results['failed']],
+            ["not a url", "https://example.com/watch?v=OZaxtm3RyCw"],
+            "Invalid lines should be reported as failed"
+        )
+        self.assertFalse(os.path.exists(self.cache_file), "Cache should not be written when nothing was downloaded")
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
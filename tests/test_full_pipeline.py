@@ -0,0 +1,35 @@
+import os
+import shutil
+import asyncio
+import tempfile
+import importlib
+import unittest
+from unittest import mock
+
+class TestFullPipeline(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Import full_pipeline from a scratch directory so its log file lands there"""
+        cls.cwd = os.getcwd()
+        cls.test_dir = tempfile.mkdtemp()
+        os.chdir(cls.test_dir)
+        cls.full_pipeline = importlib.import_module('full_pipeline')
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the scratch directory"""
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.test_dir)
+
+    def test_download_videos(self):
+        """Test that the downloader gets the downloads directory and the URL file"""
+        full_pipeline = self.full_pipeline
+        with mock.patch.object(full_pipeline, 'YoutubeDownloader') as downloader_class:
+            downloader_class.return_value.download_from_file = mock.AsyncMock()
+            asyncio.run(full_pipeline.download_videos())
+
+        downloader_class.assert_called_once_with(full_pipeline.DIRS["downloads"])
+        downloader_class.return_value.download_from_file.assert_awaited_once_with(full_pipeline.DIRS["urls"])
+
+if __name__ == '__main__':
+    unittest.main()
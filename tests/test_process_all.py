@@ -0,0 +1,19 @@
+import unittest
+from process_all import _split_prompt
+
+class TestSplitPrompt(unittest.TestCase):
+    def test_matches_str_format(self):
+        """Test that pre + transcript + post equals str.format, escaped braces included"""
+        for template in ["Resume: {transcript}", "{{Nota}} {transcript} }}fin"]:
+            pre, post = _split_prompt(template)
+            self.assertEqual(pre + "TEXTO" + post, template.format(transcript="TEXTO"))
+
+    def test_invalid_templates_are_rejected(self):
+        """Test that templates str.format would reject or render differently raise ValueError"""
+        for template in ["Sin campo", "{{transcript}}", "{transcript} {transcript}",
+                         "{transcript} {otro}", "{transcript!r}", "{transcript"]:
+            with self.assertRaises(ValueError, msg=template):
+                _split_prompt(template)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import json
+import shutil
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+import openai
+from utils.summarizer import Summarizer
+
+class TestSummarizer(unittest.TestCase):
+    def setUp(self):
+        """Run in a scratch directory with a summary prompt"""
+        self.cwd = os.getcwd()
+        self.test_dir = tempfile.mkdtemp()
+        os.chdir(self.test_dir)
+        with open('summary_prompt.txt', 'w', encoding='utf-8') as f:
+            f.write("Summarize")
+        self.summarizer = Summarizer('summaries')
+
+    def tearDown(self):
+        """Remove the scratch directory"""
+        os.chdir(self.cwd)
+        shutil.rmtree(self.test_dir)
+
+    def test_generate_summaries_batch(self):
+        """Test the batch upload arguments and that the output is saved per transcript"""
+        output = "\n".join([
+            json.dumps({"custom_id": "a.txt", "response": {"body": {"choices": [{"message": {"content": "Summary A"}}]}}}),
+            json.dumps({"custom_id": "b.txt", "response": None, "error": {"message": "failed"}})
+        ]).encode('utf-8')
+        requestor = mock.Mock()
+        requestor.arequest = mock.AsyncMock(return_value=(
+            mock.Mock(data={"id": "batch_1", "status": "completed", "output_file_id": "file_out"}), None, None
+        ))
+
+        with mock.patch.object(openai.File, 'acreate', mock.AsyncMock(return_value={"id": "file_in"})) as acreate, \
+                mock.patch.object(openai.File, 'adownload', mock.AsyncMock(return_value=output)) as adownload, \
+                mock.patch.object(openai.api_requestor, 'APIRequestor', return_value=requestor), \
+                mock.patch.object(self.summarizer, '_save_summary') as save_summary:
+            summaries = asyncio.run(self.summarizer.generate_summaries_batch({"a.txt": "text a", "b.txt": "text b"}))
+
+        # The JSONL goes up as raw bytes; the filename is passed separately
+        upload = acreate.call_args.kwargs
+        self.assertIsInstance(upload['file'], bytes)
+        self.assertEqual(upload['purpose'], "batch")
+        self.assertEqual(upload['user_provided_filename'], "summaries.jsonl")
+        requests = [json.loads(line) for line in upload['file'].decode('utf-8').splitlines()]
+        self.assertEqual([r['custom_id'] for r in requests], ["a.txt", "b.txt"])
+
+        self.assertEqual(requestor.arequest.call_args.args[:2], ("post", "/batches"))
+        self.assertEqual(requestor.arequest.call_args.kwargs['params']['input_file_id'], "file_in")
+        adownload.assert_awaited_once_with("file_out")
+        save_summary.assert_called_once_with("Summary A", "a.txt")
+        self.assertEqual(summaries, {"a.txt": "Summary A"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,9 @@
 import os
 import openai
-from moviepy.editor import VideoFileClip, AudioFileClip
 import logging
 import tempfile
 import shutil
+from utils.ffmpeg import compress_for_whisper
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -15,9 +15,9 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 def convert_video_to_audio(video_path, audio_path):
     """Convierte un archivo de video a audio MP3."""
     try:
-        video = VideoFileClip(video_path)
-        video.audio.write_audiofile(audio_path)
-        video.close()
+        # ffmpeg extrae directamente audio mono a 16 kHz (lo que usa Whisper),
+        # sin decodificar el video ni cargar el audio en memoria
+        compress_for_whisper(video_path, audio_path)
         return True
     except Exception as e:
         logger.error(f"Error al convertir video a audio: {e}")
@@ -26,9 +26,7 @@ def convert_video_to_audio(video_path, audio_path):
 def convert_audio_to_mp3(input_path, output_path):
     """Convierte un archivo de audio a formato MP3."""
     try:
-        audio = AudioFileClip(input_path)
-        audio.write_audiofile(output_path)
-        audio.close()
+        compress_for_whisper(input_path, output_path)
         return True
     except Exception as e:
         logger.error(f"Error al convertir audio a MP3: {e}")
@@ -57,10 +55,14 @@ def transcribe_files():
     os.makedirs("Transcripciones", exist_ok=True)
     
     # Crear directorio temporal
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Procesar cada archivo en el directorio Transcript
-        for filename in os.listdir("Transcript"):
-            input_path = os.path.join("Transcript", filename)
+    with tempfile.TemporaryDirectory() as temp_dir, os.scandir("Transcript") as entries:
+        # Procesar cada archivo en el directorio Transcript (un solo recorrido;
+        # scandir ya trae el tipo de cada entrada)
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            filename = entry.name
+            input_path = entry.path
             logger.info(f"Procesando: {filename}")
             
             # Determinar el tipo de archivo y convertir si es necesario
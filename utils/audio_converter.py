@@ -1,12 +1,14 @@
 import os
 import logging
-from moviepy.editor import VideoFileClip
 from typing import Dict, List
+from .ffmpeg import extract_audio, extract_audio_async
 
 class AudioConverter:
     def __init__(self, output_dir: str):
         self.output_dir = output_dir
         self.logger = logging.getLogger(__name__)
+        # Created once here rather than on every conversion
+        os.makedirs(output_dir, exist_ok=True)
         
     def convert_to_mp3(self, video_path: str) -> str:
         """Converts a video file to MP3 and returns the output path"""
@@ -14,19 +16,36 @@ class AudioConverter:
             filename = os.path.splitext(os.path.basename(video_path))[0]
             output_path = os.path.join(self.output_dir, f"{filename}.mp3")
             
+            # extract_audio only creates output_path once ffmpeg has finished, so
+            # an existing file is a complete conversion
             if os.path.exists(output_path):
                 self.logger.info(f"Audio file already exists: {output_path}")
                 return output_path
                 
             self.logger.info(f"Converting {video_path} to MP3")
-            video = VideoFileClip(video_path)
-            audio = video.audio
+            extract_audio(video_path, output_path)
             
-            os.makedirs(self.output_dir, exist_ok=True)
-            audio.write_audiofile(output_path, logger=None)
+            self.logger.info(f"Successfully converted to {output_path}")
+            return output_path
+            
+        except Exception as e:
+            self.logger.error(f"Failed to convert {video_path}: {str(e)}")
+            return ""
             
-            audio.close()
-            video.close()
+    async def convert_to_mp3_async(self, video_path: str) -> str:
+        """Async version of convert_to_mp3 that awaits ffmpeg instead of blocking on it"""
+        try:
+            filename = os.path.splitext(os.path.basename(video_path))[0]
+            output_path = os.path.join(self.output_dir, f"{filename}.mp3")
+            
+            # extract_audio only creates output_path once ffmpeg has finished, so
+            # an existing file is a complete conversion
+            if os.path.exists(output_path):
+                self.logger.info(f"Audio file already exists: {output_path}")
+                return output_path
+                
+            self.logger.info(f"Converting {video_path} to MP3")
+            await extract_audio_async(video_path, output_path)
             
             self.logger.info(f"Successfully converted to {output_path}")
             return output_path
@@ -0,0 +1,23 @@
+import os
+import copy
+import functools
+import yaml
+
+# libyaml's C parser when available, the pure-Python one otherwise
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+
+@functools.lru_cache(maxsize=4)
+def _load_yaml(path: str, mtime: float) -> dict:
+    """Parses a YAML file; cached per modification time so edits are picked up"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=_Loader)
+
+
+def load_config(path: str = "config.yaml") -> dict:
+    """Returns the parsed config file, parsing it only once per modification"""
+    # Each caller gets its own copy so nobody can alter the cached dict
+    return copy.deepcopy(_load_yaml(path, os.path.getmtime(path)))
@@ -1,30 +1,168 @@
 import os
+import json
+import time
+import hashlib
 import logging
 import asyncio
-import yt_dlp
-from pytube import YouTube
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, List, Dict, Optional
 import subprocess
+import shutil
 import sys
 import re
-import yaml
+import threading
+from .config import load_config
 from .logger import Logger
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    import yt_dlp
+
+def _yt_dlp():
+    """Imports yt-dlp on first use instead of when the module loads"""
+    # yt-dlp carga cientos de extractores; importarlo al arrancar retrasa
+    # cualquier script que solo importe este módulo. Si pip lo está
+    # actualizando en segundo plano, se espera a que termine antes de importarlo
+    update = YoutubeDownloader._dependency_update
+    if update is not None:
+        update.join()
+    import yt_dlp
+    return yt_dlp
+
+_YOUTUBE_URL_RE = re.compile(r'^https?://(www\.)?(youtube\.com|youtu\.be)/')
+
+# Patrones compilados una vez en vez de en cada llamada
+_URL_IN_TEXT_RE = re.compile(r'(?:https?://)?(?:www\.)?(?:youtube\.com/watch\?v=|youtu\.be/)[\w-]+')
+# Un solo patrón para el ID: cubre watch?v=, youtu.be/ y embed/ con una búsqueda
+_VIDEO_ID_RE = re.compile(r'(?:v=|/)([0-9A-Za-z_-]{11})')
+
+# Tabla de _sanitize_filename: borra los caracteres inválidos y cambia espacios y puntos por _
+_FILENAME_TABLE = str.maketrans({' ': '_', '.': '_', **dict.fromkeys('<>:"/\\|?*')})
+
+# Descargas simultáneas en download_from_file: se empieza con el valor inicial
+# y el controlador adaptativo lo ajusta entre el mínimo y el máximo. Descargar
+# es I/O de red, así que el techo por defecto es el de ThreadPoolExecutor
+# (núcleos + 4, hasta 32); MAX_DOWNLOAD_WORKERS lo baja para no saturar YouTube
+MAX_CONCURRENT_DOWNLOADS = 4
+MIN_CONCURRENT_DOWNLOADS = 1
+MAX_ADAPTIVE_DOWNLOADS = int(os.getenv('MAX_DOWNLOAD_WORKERS', str(min(32, (os.cpu_count() or 4) + 4))))
+ADAPTIVE_WINDOW_SECONDS = 10.0
+
+# Las actualizaciones con pip se hacen como mucho una vez al día por intérprete
+DEPENDENCY_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'ytsum', 'deps.json')
+DEPENDENCY_CHECK_MAX_AGE = 24 * 60 * 60
+
+# Videos ya descargados (ID -> [archivo, título]), para que las siguientes
+# ejecuciones no vuelvan a consultar YouTube por ellos. YTSUM_DOWNLOAD_CACHE
+# cambia la ruta por defecto; cada YoutubeDownloader puede usar la suya
+DOWNLOAD_CACHE_FILE = os.getenv(
+    'YTSUM_DOWNLOAD_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'ytsum', 'downloads.json')
+)
+
+def _dependency_cache_key() -> str:
+    """Identifies the interpreter and PATH the dependency check was done for"""
+    return hashlib.sha1((sys.executable + os.environ.get('PATH', '')).encode('utf-8')).hexdigest()
+
+def _dependencies_checked_recently() -> bool:
+    try:
+        with open(DEPENDENCY_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        return (cached.get('key') == _dependency_cache_key()
+                and time.time() - cached.get('checked_at', 0) < DEPENDENCY_CHECK_MAX_AGE)
+    except (OSError, ValueError):
+        return False
+
+def _mark_dependencies_checked():
+    try:
+        os.makedirs(os.path.dirname(DEPENDENCY_CACHE_FILE), exist_ok=True)
+        with open(DEPENDENCY_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'key': _dependency_cache_key(), 'checked_at': time.time()}, f)
+    except OSError:
+        pass
+
+class AdaptiveConcurrency:
+    """Adjusts the number of in-flight downloads from the throughput measured by yt-dlp"""
+    
+    def __init__(self, initial: int = MAX_CONCURRENT_DOWNLOADS, minimum: int = MIN_CONCURRENT_DOWNLOADS,
+                 maximum: int = MAX_ADAPTIVE_DOWNLOADS, window: float = ADAPTIVE_WINDOW_SECONDS):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.window = window
+        self.active = 0
+        self.logger = logging.getLogger(__name__)
+        self._condition = asyncio.Condition()
+        # Los progress hooks de yt-dlp se ejecutan en los hilos de descarga
+        self._bytes_lock = threading.Lock()
+        self._window_bytes = 0
+        self._seen_bytes: Dict[str, int] = {}
+        self._last_throughput: Optional[float] = None
+    
+    def progress_hook(self, d: dict):
+        """yt-dlp progress hook that accumulates the bytes downloaded in the current window"""
+        if d.get('status') not in ('downloading', 'finished'):
+            return
+        key = d.get('tmpfilename') or d.get('filename', '')
+        downloaded = d.get('downloaded_bytes') or 0
+        with self._bytes_lock:
+            # downloaded_bytes es acumulado por archivo; sumar solo el incremento
+            self._window_bytes += max(0, downloaded - self._seen_bytes.get(key, 0))
+            self._seen_bytes[key] = downloaded
+    
+    async def acquire(self):
+        """Waits until a download slot is free under the current limit"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+    
+    async def release(self):
+        """Frees a download slot"""
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+    
+    async def run(self):
+        """Control loop: grows the limit while throughput improves, shrinks it when it drops >20%"""
+        while True:
+            await asyncio.sleep(self.window)
+            with self._bytes_lock:
+                window_bytes, self._window_bytes = self._window_bytes, 0
+            throughput = window_bytes / self.window
+            
+            async with self._condition:
+                previous = self._last_throughput
+                if previous is not None:
+                    if throughput > previous and self.limit < self.maximum:
+                        self.limit += 1
+                        self._condition.notify_all()
+                    elif throughput < previous * 0.8 and self.limit > self.minimum:
+                        self.limit -= 1
+                self._last_throughput = throughput
+            
+            self.logger.debug(f"Download throughput {throughput / 1024 / 1024:.2f} MB/s, concurrency {self.limit}")
+
 class YoutubeDownloader:
-    def __init__(self, output_dir: str):
+    # La comprobación de dependencias se hace una sola vez por proceso
+    _dependencies_checked = False
+    # Hilo que actualiza las dependencias, si hay una actualización en curso
+    _dependency_update: Optional[threading.Thread] = None
+    
+    def __init__(self, output_dir: str, cache_file: Optional[str] = None):
         self.output_dir = output_dir
         self.logger = logging.getLogger(__name__)
         self.config = self._load_config()
+        # [archivo, título] por ID de video: los reintentos, las URLs repetidas y
+        # las ejecuciones siguientes no vuelven a pedir metadatos ni a descargar
+        self.cache_file = cache_file or DOWNLOAD_CACHE_FILE
+        self._downloads: Dict[str, List[str]] = self._load_downloads()
+        # Solo se reescribe la caché cuando se ha añadido o cambiado una entrada
+        self._downloads_changed = False
         self._ensure_dependencies()
         os.makedirs(output_dir, exist_ok=True)
     
     def _load_config(self) -> dict:
         """Carga la configuración desde config.yaml"""
         try:
-            with open("config.yaml", 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-                return config['download']
+            return load_config("config.yaml")['download']
         except Exception as e:
             self.logger.error(f"Error loading config: {str(e)}")
             return {
@@ -35,8 +173,66 @@ class YoutubeDownloader:
                 'output_dir': 'Descargas'
             }
     
+    def _load_downloads(self) -> Dict[str, List[str]]:
+        """Loads the video ID -> [file name, title] cache kept across runs"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_downloads(self):
+        """Writes the download cache atomically if it changed since it was loaded or last saved"""
+        if not self._downloads_changed:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+            with open(self.cache_file + '.part', 'w', encoding='utf-8') as f:
+                json.dump(self._downloads, f)
+            os.replace(self.cache_file + '.part', self.cache_file)
+            self._downloads_changed = False
+        except OSError as e:
+            self.logger.warning(f"Could not save download cache: {str(e)}")
+    
+    def _cached_download(self, video_id: str) -> Optional[tuple[str, str]]:
+        """Returns (file_path, title) if the video was downloaded before and its file is still there"""
+        cached = self._downloads.get(video_id)
+        if not cached:
+            return None
+        # Se guarda solo el nombre: el archivo se busca en el directorio de salida actual
+        filepath = os.path.join(self.output_dir, cached[0])
+        if not os.path.exists(filepath):
+            return None
+        return filepath, cached[1]
+    
+    def _remember_download(self, video_id: str, filename: str, title: str):
+        entry = [os.path.basename(filename), title]
+        if self._downloads.get(video_id) != entry:
+            self._downloads[video_id] = entry
+            self._downloads_changed = True
+    
     def _ensure_dependencies(self):
         """Asegura que las dependencias estén instaladas y actualizadas"""
+        # Evitar lanzar pip (segundos por llamada) en cada instancia y en cada ejecución;
+        # YTSUM_UPDATE_DEPS=0 lo desactiva del todo y YTSUM_UPDATE_DEPS=force
+        # actualiza aunque ya se haya comprobado en las últimas 24h
+        mode = os.getenv('YTSUM_UPDATE_DEPS', '1')
+        if YoutubeDownloader._dependencies_checked or mode == '0':
+            return
+        YoutubeDownloader._dependencies_checked = True
+        
+        if mode != 'force' and _dependencies_checked_recently():
+            self.logger.debug("Dependencies checked in the last 24h, skipping update")
+            return
+        
+        # pip tarda varios segundos: corre en segundo plano mientras el resto del
+        # pipeline arranca. No es daemon para que salir no corte una instalación
+        update = threading.Thread(target=self._update_dependencies, name="ytsum-deps")
+        YoutubeDownloader._dependency_update = update
+        update.start()
+    
+    def _update_dependencies(self):
+        """Actualiza yt-dlp con pip y registra la comprobación"""
         try:
             # Actualizar yt-dlp
             subprocess.run([sys.executable, "-m", "pip", "install", "--upgrade", "yt-dlp"], 
@@ -44,24 +240,20 @@ class YoutubeDownloader:
             self.logger.info("yt-dlp updated successfully")
         except Exception as e:
             self.logger.warning(f"Could not update yt-dlp: {str(e)}")
+        
+        # pytube no se usa en ninguna ruta de descarga: no vale la pena actualizarlo
             
-        try:
-            # Actualizar pytube como respaldo
-            subprocess.run([sys.executable, "-m", "pip", "install", "--upgrade", "pytube"], 
-                         capture_output=True, check=True)
-            self.logger.info("pytube updated successfully")
-        except Exception as e:
-            self.logger.warning(f"Could not update pytube: {str(e)}")
+        # También se registra si falló (p. ej. sin red), para no reintentarlo en cada arranque
+        _mark_dependencies_checked()
     
     def _extract_urls(self, file_path: str) -> List[str]:
         """Extrae URLs de YouTube de un archivo de texto"""
         urls = []
-        url_pattern = r'(?:https?://)?(?:www\.)?(?:youtube\.com/watch\?v=|youtu\.be/)[\w-]+'
         
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-                matches = re.finditer(url_pattern, content)
+                matches = _URL_IN_TEXT_RE.finditer(content)
                 urls = [match.group() for match in matches]
             
             self.logger.info(f"Found {len(urls)} valid YouTube URLs in {file_path}")
@@ -72,18 +264,57 @@ class YoutubeDownloader:
     
     def _extract_video_id(self, url: str) -> str:
         """Extract video ID from YouTube URL"""
-        patterns = [
-            r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',  # URLs normales y compartidas
-            r'youtu\.be\/([0-9A-Za-z_-]{11})',   # URLs cortas
-            r'embed\/([0-9A-Za-z_-]{11})'        # URLs de embed
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
+        match = _VIDEO_ID_RE.search(url)
+        return match.group(1) if match else None
+    
+    def _get_ydl_opts(self) -> dict:
+        """Returns the yt-dlp options shared by every download"""
+        opts = {
+            'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+            'outtmpl': os.path.join(self.output_dir, '%(title)s.%(ext)s'),
+            'quiet': True,
+            'no_warnings': True,
+            # Descargar varios fragmentos DASH/HLS en paralelo
+            'concurrent_fragment_downloads': 8,
+            # Pedir los archivos en rangos de 10 MB evita el throttling de YouTube
+            # sobre conexiones largas
+            'http_chunk_size': 10 * 1024 * 1024
+        }
+        # aria2c abre varias conexiones por archivo; es opcional porque solo
+        # informa el progreso al terminar (el control adaptativo lo ve a saltos)
+        if self.config.get('use_aria2c') and shutil.which('aria2c'):
+            opts['external_downloader'] = 'aria2c'
+            opts['external_downloader_args'] = ['-x', '16', '-k', '1M']
+        return opts
+    
+    def _download_with(self, ydl: 'yt_dlp.YoutubeDL', url: str) -> tuple[str, str]:
+        """Downloads a URL with an open YoutubeDL session and returns (file_path, title)"""
+        try:
+            # extract_info con download=True extrae y descarga en una sola pasada;
+            # si el archivo ya existe, yt-dlp lo detecta y no lo vuelve a bajar
+            info = ydl.extract_info(url, download=True)
+            if not info:
+                return None, None
+            
+            downloads = info.get('requested_downloads') or [{}]
+            filename = downloads[0].get('filepath') or ydl.prepare_filename(info)
+            title = info.get('title', '')
+            
+            if os.path.exists(filename):
+                self.logger.info(f"Successfully downloaded {filename}")
+                return filename, title
                 
-        return None
+            return None, None
+            
+        except Exception as e:
+            self.logger.error(f"Failed to download {url}: {str(e)}")
+            return None, None
+    
+    def _download_single(self, url: str) -> tuple[str, str]:
+        """Downloads a single URL in its own YoutubeDL session"""
+        # Download in a single extraction; no separate metadata probe
+        with _yt_dlp().YoutubeDL(self._get_ydl_opts()) as ydl:
+            return self._download_with(ydl, url)
     
     async def download_url(self, url: str) -> tuple[str, str]:
         """Downloads a video from a URL and returns (file_path, title)"""
@@ -93,59 +324,105 @@ class YoutubeDownloader:
             if not video_id:
                 self.logger.error(f"Invalid YouTube URL: {url}")
                 return None, None
+            
+            cached = self._cached_download(video_id)
+            if cached:
+                self.logger.info(f"Already downloaded {url}: {cached[0]}")
+                return cached
                 
             self.logger.info(f"Downloading {url}")
             
-            # Configure yt-dlp
-            ydl_opts = {
-                'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-                'outtmpl': os.path.join(self.output_dir, '%(title)s.%(ext)s'),
-                'quiet': True,
-                'no_warnings': True
-            }
-            
-            # Get video info first
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                filename = ydl.prepare_filename(info)
-                title = info.get('title', '')
-                
-                # Check if file already exists
-                if os.path.exists(filename):
-                    self.logger.info(f"Video already exists: {filename}")
-                    return filename, title
-                    
-                # Download video
-                self.logger.info(f"Downloading to {filename}")
-                ydl.download([url])
-                
-                if os.path.exists(filename):
-                    self.logger.info(f"Successfully downloaded {filename}")
-                    return filename, title
-                    
-            return None, None
+            # yt-dlp is blocking; run it in a worker thread so the event loop stays free
+            filename, title = await asyncio.to_thread(self._download_single, url)
+            if filename:
+                self._remember_download(video_id, filename, title)
+                self._save_downloads()
+            return filename, title
             
         except Exception as e:
             self.logger.error(f"Failed to download {url}: {str(e)}")
             return None, None
 
-    async def download_from_file(self, urls_file: str) -> Dict[str, List[str]]:
-        """Downloads videos from a file containing URLs"""
+    async def download_from_file(self, urls_file: str, max_workers: Optional[int] = None) -> Dict[str, List[str]]:
+        """Downloads videos from a file containing URLs, with at most max_workers at once"""
         results = {
             'success': [],
             'failed': []
         }
         
         try:
-            with open(urls_file, 'r') as f:
-                urls = [line.strip() for line in f if line.strip()]
+            with open(urls_file, 'r', encoding='utf-8') as f:
+                lines = list(filter(None, map(str.strip, f.read().splitlines())))
                 
         except Exception as e:
             self.logger.error(f"Failed to read URLs file: {str(e)}")
             return results
-            
-        for url in urls:
-            filename, title = await self.download_url(url)
+        
+        # Descartar las líneas que no son URLs de YouTube antes de tocar la red
+        urls = []
+        for line in lines:
+            if _YOUTUBE_URL_RE.match(line):
+                urls.append(line)
+            else:
+                self.logger.warning(f"Skipping invalid YouTube URL: {line}")
+                results['failed'].append((line, None))
+        
+        # Varios workers descargan en paralelo desde una cola compartida. Cada uno
+        # mantiene su propia sesión de yt-dlp (YoutubeDL no es thread-safe), que
+        # reutiliza el pool de conexiones HTTP para todas las URLs que procesa.
+        # Cuántos descargan a la vez lo decide el controlador adaptativo
+        if max_workers is not None and max_workers < 1:
+            raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+        maximum = max_workers if max_workers is not None else MAX_ADAPTIVE_DOWNLOADS
+        concurrency = AdaptiveConcurrency(initial=min(MAX_CONCURRENT_DOWNLOADS, maximum), maximum=maximum)
+        ydl_opts = self._get_ydl_opts()
+        ydl_opts['progress_hooks'] = [concurrency.progress_hook]
+        
+        queue = asyncio.Queue()
+        downloads = [(None, None)] * len(urls)
+        video_ids = [self._extract_video_id(url) for url in urls]
+        for index, (url, video_id) in enumerate(zip(urls, video_ids)):
+            # Los videos descargados en otra ejecución no se vuelven a pedir
+            cached = self._cached_download(video_id) if video_id else None
+            if cached:
+                self.logger.info(f"Already downloaded {url}: {cached[0]}")
+                downloads[index] = cached
+            else:
+                queue.put_nowait((index, url))
+        
+        async def worker():
+            ydl = None
+            try:
+                while True:
+                    await concurrency.acquire()
+                    try:
+                        if queue.empty():
+                            return
+                        index, url = queue.get_nowait()
+                        if ydl is None:
+                            # El import puede esperar a pip y tardar segundos;
+                            # se hace en un hilo para no bloquear el event loop
+                            ydl = await asyncio.to_thread(lambda: _yt_dlp().YoutubeDL(ydl_opts))
+                        self.logger.info(f"Downloading {url}")
+                        downloads[index] = await asyncio.to_thread(self._download_with, ydl, url)
+                    finally:
+                        await concurrency.release()
+            finally:
+                if ydl is not None:
+                    ydl.close()
+        
+        controller = asyncio.create_task(concurrency.run())
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(concurrency.maximum, queue.qsize()))))
+        finally:
+            controller.cancel()
+        
+        for video_id, (filename, title) in zip(video_ids, downloads):
+            if video_id and filename:
+                self._remember_download(video_id, filename, title)
+        self._save_downloads()
+        
+        for url, (filename, title) in zip(urls, downloads):
             if filename:
                 results['success'].append((filename, title))
             else:
@@ -156,16 +433,10 @@ class YoutubeDownloader:
 
     def _sanitize_filename(self, filename: str) -> str:
         """Sanitize filename to be safe for all operating systems"""
-        # Remove invalid characters
-        invalid_chars = '<>:"/\\|?*'
-        for char in invalid_chars:
-            filename = filename.replace(char, '')
-            
-        # Replace spaces and dots with underscores
-        filename = filename.replace(' ', '_').replace('.', '_')
-        
-        # Remove any non-ASCII characters
-        filename = ''.join(c for c in filename if ord(c) < 128)
+        # Remove invalid characters and replace spaces and dots with underscores
+        # in one C-level pass, then drop any non-ASCII characters
+        filename = filename.translate(_FILENAME_TABLE)
+        filename = filename.encode('ascii', 'ignore').decode('ascii')
         
         # Limit length
         max_length = 200
@@ -0,0 +1,181 @@
+import os
+import asyncio
+import subprocess
+from typing import List, Optional
+
+
+def _check(args: List[str], returncode: int, stderr: bytes) -> None:
+    if returncode != 0:
+        error = stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"{args[0]} exited with code {returncode}: {error[-500:]}")
+
+
+def _run(args: List[str]) -> None:
+    """Runs an ffmpeg command and raises RuntimeError with its stderr on failure"""
+    # ffmpeg reads keyboard commands from stdin; inheriting it would let it
+    # consume the terminal's input or stop when run in the background
+    process = subprocess.run(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _check(args, process.returncode, process.stderr)
+
+
+async def _run_async(args: List[str]) -> None:
+    """Like _run, but awaits the child process instead of blocking a thread on it"""
+    process = await asyncio.create_subprocess_exec(
+        *args, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    _check(args, process.returncode, stderr)
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _run_atomic(args: List[str], partial_path: str, output_path: str) -> None:
+    """Runs a command that writes partial_path and renames it to output_path only if it succeeds"""
+    # An interrupted or failed run never leaves a truncated file at output_path,
+    # so callers can treat an existing output as complete
+    try:
+        _run(args)
+    except BaseException:
+        _discard(partial_path)
+        raise
+    os.replace(partial_path, output_path)
+
+
+async def _run_atomic_async(args: List[str], partial_path: str, output_path: str) -> None:
+    """Async version of _run_atomic"""
+    try:
+        await _run_async(args)
+    except BaseException:
+        _discard(partial_path)
+        raise
+    os.replace(partial_path, output_path)
+
+
+def _extract_audio_args(video_path: str, output_path: str, bitrate: str, threads: int) -> List[str]:
+    return [
+        "ffmpeg", "-y", "-i", video_path,
+        "-vn",
+        "-acodec", "libmp3lame", "-b:a", bitrate,
+        "-threads", str(threads),
+        # The .part name says nothing about the format
+        "-f", "mp3",
+        output_path
+    ]
+
+
+def extract_audio(video_path: str, output_path: str, bitrate: str = "192k", threads: int = 0) -> None:
+    """Extracts the audio track of a video to MP3 without decoding the video stream"""
+    partial_path = output_path + ".part"
+    _run_atomic(_extract_audio_args(video_path, partial_path, bitrate, threads), partial_path, output_path)
+
+
+async def extract_audio_async(video_path: str, output_path: str, bitrate: str = "192k", threads: int = 0) -> None:
+    """Async version of extract_audio"""
+    partial_path = output_path + ".part"
+    await _run_atomic_async(_extract_audio_args(video_path, partial_path, bitrate, threads), partial_path, output_path)
+
+
+def compress_for_whisper(audio_path: str, output_path: str) -> None:
+    """Re-encodes audio as 16 kHz mono 64 kbps MP3, the most Whisper can use, to shrink the upload"""
+    _run([
+        "ffmpeg", "-y", "-i", audio_path,
+        "-vn", "-ac", "1", "-ar", "16000",
+        "-acodec", "libmp3lame", "-b:a", "64k",
+        "-f", "mp3",
+        output_path
+    ])
+
+
+def _probe_audio_codec_args(path: str) -> List[str]:
+    return [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        path
+    ]
+
+
+def probe_audio_codec(path: str) -> Optional[str]:
+    """Returns the codec name of the first audio stream, or None if it cannot be probed"""
+    try:
+        process = subprocess.run(_probe_audio_codec_args(path), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except FileNotFoundError:
+        # Without ffprobe the caller cannot pick stream copy and re-encodes instead
+        return None
+    if process.returncode != 0:
+        return None
+    return process.stdout.decode('utf-8', errors='replace').strip() or None
+
+
+async def probe_audio_codec_async(path: str) -> Optional[str]:
+    """Async version of probe_audio_codec"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *_probe_audio_codec_args(path), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+    except FileNotFoundError:
+        return None
+    stdout, _ = await process.communicate()
+    if process.returncode != 0:
+        return None
+    return stdout.decode('utf-8', errors='replace').strip() or None
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """Returns the duration in seconds reported by the container, or None if it cannot be probed"""
+    try:
+        process = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+    except FileNotFoundError:
+        return None
+    if process.returncode != 0:
+        return None
+    try:
+        return float(process.stdout.decode('utf-8', errors='replace').strip())
+    except ValueError:
+        return None
+
+
+def _copy_audio_args(video_path: str, output_path: str) -> List[str]:
+    return [
+        "ffmpeg", "-y", "-i", video_path,
+        "-vn", "-acodec", "copy",
+        "-f", "mp3",
+        output_path
+    ]
+
+
+def copy_audio(video_path: str, output_path: str) -> None:
+    """Remuxes the MP3 audio track of a video into output_path without re-encoding"""
+    partial_path = output_path + ".part"
+    _run_atomic(_copy_audio_args(video_path, partial_path), partial_path, output_path)
+
+
+async def copy_audio_async(video_path: str, output_path: str) -> None:
+    """Async version of copy_audio"""
+    partial_path = output_path + ".part"
+    await _run_atomic_async(_copy_audio_args(video_path, partial_path), partial_path, output_path)
+
+
+def split_audio(audio_path: str, output_dir: str, segment_seconds: int = 600) -> List[str]:
+    """Splits audio into consecutive segments without re-encoding and returns their paths in order"""
+    extension = os.path.splitext(audio_path)[1]
+    _run([
+        "ffmpeg", "-y", "-i", audio_path,
+        "-f", "segment", "-segment_time", str(segment_seconds),
+        "-c", "copy",
+        os.path.join(output_dir, f"part_%03d{extension}")
+    ])
+    return sorted(
+        os.path.join(output_dir, name)
+        for name in os.listdir(output_dir)
+        if name.startswith("part_")
+    )
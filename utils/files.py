@@ -0,0 +1,23 @@
+import os
+from typing import Iterator, Set, Tuple
+
+
+def iter_media(directory: str, extensions: Tuple[str, ...]) -> Iterator[os.DirEntry]:
+    """Yields the files in a directory whose name ends with one of the (lowercase) extensions"""
+    # scandir keeps the stat info from the directory read, so entry.stat()
+    # and entry.is_file() don't need another syscall per file
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith(extensions) and entry.is_file():
+                yield entry
+
+
+def existing_stems(directory: str, extension: str) -> Set[str]:
+    """Returns the base names of the files in a directory that end with the extension"""
+    # One directory read per step; later existence checks are set lookups
+    with os.scandir(directory) as entries:
+        return {
+            os.path.splitext(entry.name)[0]
+            for entry in entries
+            if entry.name.endswith(extension)
+        }
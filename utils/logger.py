@@ -1,21 +1,50 @@
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from datetime import datetime
-import yaml
+import queue
+from typing import Dict
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler
+from .config import load_config
+
+# Registros acumulados antes de escribir en los archivos de log
+LOG_BUFFER_CAPACITY = 256
+
+class _CachedTimeFormatter(logging.Formatter):
+    """Formatter que reutiliza el texto de asctime mientras no cambie el segundo"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cached_time = (None, '')
+    
+    def formatTime(self, record, datefmt=None):
+        # date_format tiene resolución de segundos: el mismo registro pasa por
+        # varios handlers y muchos registros caen en el mismo segundo. Sin datefmt
+        # el formato incluye milisegundos y no se puede reutilizar
+        if not datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, cached_text = self._cached_time
+        if second != cached_second:
+            cached_text = super().formatTime(record, datefmt)
+            self._cached_time = (second, cached_text)
+        return cached_text
 
 class Logger:
+    # Loggers ya configurados por módulo: otro Logger para el mismo módulo reutiliza
+    # sus handlers y su hilo en vez de duplicarlos (y escribir cada registro dos veces)
+    _loggers: Dict[str, logging.Logger] = {}
+    
     def __init__(self, module_name: str):
         self.module_name = module_name
         self.config = self._load_config()
-        self.logger = self._setup_logger()
+        if module_name not in Logger._loggers:
+            Logger._loggers[module_name] = self._setup_logger()
+        self.logger = Logger._loggers[module_name]
     
     def _load_config(self) -> dict:
         """Carga la configuración desde config.yaml"""
         try:
-            with open("config.yaml", 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-                return config['logging']
+            return load_config("config.yaml")['logging']
         except Exception as e:
             # Configuración por defecto si hay error
             return {
@@ -42,7 +71,7 @@ class Logger:
             os.makedirs(dir_path, exist_ok=True)
         
         # Formato común para todos los handlers
-        formatter = logging.Formatter(
+        formatter = _CachedTimeFormatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt=self.config['date_format']
         )
@@ -80,13 +109,29 @@ class Logger:
         console_handler.setFormatter(formatter)
         
         # Agregar handlers al logger
-        logger.addHandler(general_handler)
-        logger.addHandler(error_handler)
-        logger.addHandler(debug_handler)
-        logger.addHandler(console_handler)
+        # Los archivos se escriben en bloques (o de inmediato ante un ERROR) en vez de
+        # una escritura por registro; logging vacía los búferes al salir
+        handlers = [self._buffered(h) for h in (general_handler, error_handler, debug_handler)]
+        handlers.append(console_handler)
+        
+        # El logger solo encola los registros; un hilo de fondo los pasa a los
+        # handlers, así las descargas y transcripciones no esperan a la escritura
+        log_queue = queue.Queue(-1)
+        self._log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        self._log_listener.start()
+        atexit.register(self._log_listener.stop)
+        logger.addHandler(QueueHandler(log_queue))
         
         return logger
     
+    @staticmethod
+    def _buffered(handler: logging.Handler) -> MemoryHandler:
+        """Envuelve un handler de archivo en un búfer de LOG_BUFFER_CAPACITY registros"""
+        buffered = MemoryHandler(LOG_BUFFER_CAPACITY, flushLevel=logging.ERROR, target=handler)
+        # MemoryHandler no filtra por el nivel del destino al vaciarse
+        buffered.setLevel(handler.level)
+        return buffered
+    
     def debug(self, message: str):
         """Log a debug message"""
         self.logger.debug(message)
@@ -1,9 +1,14 @@
 import os
+import json
+import asyncio
 import logging
 import openai
 from typing import Dict, List
 from dotenv import load_dotenv
 
+# Seconds between status checks of a submitted batch job
+BATCH_POLL_SECONDS = 60
+
 class Summarizer:
     def __init__(self, output_dir: str):
         self.output_dir = output_dir
@@ -19,25 +24,13 @@ class Summarizer:
         """Generate a summary from text."""
         try:
             # Generate summary using OpenAI API
-            response = await openai.ChatCompletion.acreate(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": self.summary_prompt},
-                    {"role": "user", "content": text}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
+            response = await openai.ChatCompletion.acreate(**self._request_body(text))
             
             summary = response.choices[0].message.content
             
             # Save summary using original filename
             if summary:
-                filename = self._get_filename(transcript_filename)
-                filepath = os.path.join(self.output_dir, filename)
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(summary)
-                self.logger.info(f"Summary saved to {filename}")
+                self._save_summary(summary, transcript_filename)
             
             return summary
             
@@ -45,6 +38,86 @@ class Summarizer:
             self.logger.error(f"Failed to generate summary: {str(e)}")
             return None
         
+    def _request_body(self, text: str) -> dict:
+        """Build the chat completion parameters for one transcript."""
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": [
+                {"role": "system", "content": self.summary_prompt},
+                {"role": "user", "content": text}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 500
+        }
+        
+    def _save_summary(self, summary: str, transcript_filename: str) -> None:
+        """Write a summary next to the others using the transcript's name."""
+        filename = self._get_filename(transcript_filename)
+        filepath = os.path.join(self.output_dir, filename)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(summary)
+        self.logger.info(f"Summary saved to {filename}")
+        
+    async def generate_summaries_batch(self, texts: Dict[str, str]) -> Dict[str, str]:
+        """Summarize many transcripts in one OpenAI Batch API job.
+        
+        texts maps transcript filenames to their content. Batch jobs are billed
+        at half price and do not count against the per-minute quota, but can take
+        up to 24 hours, so this is meant for backlogs rather than interactive runs.
+        Returns the summaries that completed, keyed by transcript filename.
+        """
+        lines = [
+            json.dumps({
+                "custom_id": transcript_filename,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._request_body(text)
+            })
+            for transcript_filename, text in texts.items()
+        ]
+        # File.acreate wraps the file itself; the name goes in user_provided_filename
+        batch_file = await openai.File.acreate(
+            file="\n".join(lines).encode('utf-8'),
+            purpose="batch",
+            user_provided_filename="summaries.jsonl"
+        )
+        
+        # openai 0.x has no Batch resource, so talk to the endpoint directly
+        requestor = openai.api_requestor.APIRequestor()
+        response, _, _ = await requestor.arequest("post", "/batches", params={
+            "input_file_id": batch_file["id"],
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h"
+        })
+        batch = response.data
+        self.logger.info(f"Submitted batch {batch['id']} with {len(lines)} summaries")
+        
+        while batch["status"] not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+            response, _, _ = await requestor.arequest("get", f"/batches/{batch['id']}")
+            batch = response.data
+            
+        if not batch.get("output_file_id"):
+            self.logger.error(f"Batch {batch['id']} finished with status {batch['status']}")
+            return {}
+            
+        output = await openai.File.adownload(batch["output_file_id"])
+        summaries = {}
+        for line in output.decode('utf-8').splitlines():
+            result = json.loads(line)
+            body = (result.get("response") or {}).get("body") or {}
+            choices = body.get("choices")
+            if not choices:
+                self.logger.error(f"Batch request failed for {result['custom_id']}: {result.get('error')}")
+                continue
+            summary = choices[0]["message"]["content"]
+            if summary:
+                self._save_summary(summary, result["custom_id"])
+                summaries[result["custom_id"]] = summary
+                
+        self.logger.info(f"Batch {batch['id']} done: {len(summaries)}/{len(lines)} summaries")
+        return summaries
+        
     def _get_filename(self, transcript_filename: str) -> str:
         """Generate summary filename from transcript filename."""
         # Remove .txt and add _summary.txt
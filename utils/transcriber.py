@@ -1,9 +1,24 @@
 import os
 import logging
+import tempfile
+import threading
 import openai
-from moviepy.editor import AudioFileClip
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+from .ffmpeg import probe_duration, split_audio
+
+# Chunks of a large file uploaded to Whisper at the same time; bounded by the API rate limit
+MAX_PARALLEL_CHUNKS = int(os.getenv('TRANSCRIBE_CONCURRENCY', '8'))
+
+# Whisper uploads in flight across every Transcriber and thread in the process. Each
+# holds up to ~25MB of audio in memory, so this caps memory however many videos
+# or chunks callers run in parallel
+MAX_INFLIGHT_UPLOADS = int(os.getenv('WHISPER_MAX_UPLOADS', '16'))
+_upload_slots = threading.BoundedSemaphore(MAX_INFLIGHT_UPLOADS)
+
+# Longest chunk sent to Whisper; shortened for high-bitrate files so chunks stay under the size limit
+MAX_SEGMENT_SECONDS = 600
 
 class Transcriber:
     def __init__(self, output_dir: str):
@@ -12,25 +27,27 @@ class Transcriber:
         load_dotenv()
         openai.api_key = os.getenv('OPENAI_API_KEY')
         self.max_chunk_size = 24 * 1024 * 1024  # 24MB para estar seguros
+        self._duration_cache: Dict[str, float] = {}
         
-    def transcribe_audio(self, audio_path: str) -> tuple[bool, str]:
-        """Transcribe an audio file."""
+    def transcribe_audio(self, audio_path: str) -> tuple[bool, str, str]:
+        """Transcribe an audio file and return (success, transcript path, transcript text)."""
         try:
             # Verificar si ya existe una transcripción válida
             output_path = os.path.join(self.output_dir, os.path.splitext(os.path.basename(audio_path))[0] + '.txt')
             if os.path.exists(output_path):
                 self.logger.info(f"Valid transcription exists: {output_path}")
-                return True, output_path
+                with open(output_path, 'r', encoding='utf-8') as f:
+                    return True, output_path, f.read()
                 
             self.logger.info(f"Transcribing {audio_path}")
             
             # Verificar tamaño del archivo
             file_size = os.path.getsize(audio_path)
             if file_size > self.max_chunk_size:
-                return self._transcribe_large_file(audio_path)
+                return self._transcribe_large_file(audio_path, file_size)
             
             # Transcribir archivo completo
-            with open(audio_path, 'rb') as audio_file:
+            with _upload_slots, open(audio_path, 'rb') as audio_file:
                 response = openai.Audio.transcribe(
                     "whisper-1",
                     audio_file
@@ -38,71 +55,86 @@ class Transcriber:
                 
             if not response or not response.get('text'):
                 self.logger.error(f"No transcription generated for {audio_path}")
-                return False, ""
+                return False, "", ""
                 
             # Guardar transcripción
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(response['text'])
                 
             self.logger.info(f"Successfully transcribed to {output_path}")
-            return True, output_path
+            return True, output_path, response['text']
             
         except Exception as e:
             self.logger.error(f"Failed to transcribe {audio_path}: {str(e)}")
-            return False, ""
+            return False, "", ""
             
-    def _transcribe_large_file(self, audio_path: str) -> tuple[bool, str]:
-        """Transcribe a large audio file by splitting it into chunks."""
+    def _transcribe_chunk(self, idx: int, total: int, chunk_path: str) -> str:
+        """Transcribe one chunk of a large file, returning an empty string on failure."""
+        self.logger.info(f"Transcribing chunk {idx + 1}/{total}")
         try:
-            # Cargar audio
-            audio = AudioFileClip(audio_path)
-            chunk_duration = 600  # 10 minutos en segundos
-            total_duration = audio.duration
-            chunks = []
+            with _upload_slots, open(chunk_path, 'rb') as audio_file:
+                response = openai.Audio.transcribe(
+                    "whisper-1",
+                    audio_file
+                )
+            return response.get('text', '') if response else ''
+        except Exception as e:
+            self.logger.error(f"Failed to transcribe chunk {chunk_path}: {str(e)}")
+            return ''
             
-            # Dividir en chunks
-            for start_time in range(0, int(total_duration), chunk_duration):
-                end_time = min(start_time + chunk_duration, total_duration)
-                chunk = audio.subclip(start_time, end_time)
-                chunk_path = f"{audio_path}_chunk_{start_time//chunk_duration}.mp3"
-                chunk.write_audiofile(chunk_path)
-                chunks.append(chunk_path)
-                
-            # Cerrar el clip de audio
-            audio.close()
+    def _get_duration(self, audio_path: str) -> Optional[float]:
+        """Probe an audio file's duration once; retries reuse the cached value."""
+        if audio_path not in self._duration_cache:
+            duration = probe_duration(audio_path)
+            if duration is None:
+                return None
+            self._duration_cache[audio_path] = duration
+        return self._duration_cache[audio_path]
+        
+    def _segment_seconds(self, audio_path: str, file_size: int) -> int:
+        """Pick a chunk length that keeps every chunk under max_chunk_size."""
+        duration = self._get_duration(audio_path)
+        if not duration:
+            return MAX_SEGMENT_SECONDS
+        # Bytes per second from the real size and duration, with a 10% margin for VBR
+        seconds = int(duration * self.max_chunk_size / file_size * 0.9)
+        return max(60, min(MAX_SEGMENT_SECONDS, seconds))
+        
+    def _transcribe_large_file(self, audio_path: str, file_size: int) -> tuple[bool, str, str]:
+        """Transcribe a large audio file by splitting it into chunks."""
+        try:
+            with tempfile.TemporaryDirectory() as chunk_dir:
+                # Dividir en chunks sin recodificar (-c copy)
+                segment_seconds = self._segment_seconds(audio_path, file_size)
+                chunks = split_audio(audio_path, chunk_dir, segment_seconds=segment_seconds)
                 
-            # Transcribir cada chunk
-            transcriptions = []
-            for chunk_path in chunks:
-                try:
-                    with open(chunk_path, 'rb') as audio_file:
-                        response = openai.Audio.transcribe(
-                            "whisper-1",
-                            audio_file
-                        )
-                        if response and response.get('text'):
-                            transcriptions.append(response['text'])
-                except Exception as e:
-                    self.logger.error(f"Failed to transcribe chunk {chunk_path}: {str(e)}")
-                finally:
-                    # Limpiar chunk
-                    if os.path.exists(chunk_path):
-                        os.remove(chunk_path)
+                # Transcribir los chunks en paralelo; cada resultado se guarda en su
+                # posición a medida que termina, sin esperar a los anteriores
+                results = [''] * len(chunks)
+                with ThreadPoolExecutor(max_workers=MAX_PARALLEL_CHUNKS) as executor:
+                    futures = {
+                        executor.submit(self._transcribe_chunk, idx, len(chunks), chunk_path): idx
+                        for idx, chunk_path in enumerate(chunks)
+                    }
+                    for future in as_completed(futures):
+                        results[futures[future]] = future.result()
+                transcriptions = [text for text in results if text]
                         
             if not transcriptions:
-                return False, ""
+                return False, "", ""
                 
             # Combinar transcripciones
+            text = "\n\n".join(transcriptions)
             output_path = os.path.join(self.output_dir, os.path.splitext(os.path.basename(audio_path))[0] + '.txt')
             with open(output_path, 'w', encoding='utf-8') as f:
-                f.write("\n\n".join(transcriptions))
+                f.write(text)
                 
             self.logger.info(f"Successfully transcribed large file to {output_path}")
-            return True, output_path
+            return True, output_path, text
             
         except Exception as e:
             self.logger.error(f"Failed to transcribe large file {audio_path}: {str(e)}")
-            return False, ""
+            return False, "", ""
             
     def _format_transcription(self, text: str) -> str:
         """Format transcription with proper punctuation and paragraphs."""
@@ -138,7 +170,7 @@ class Transcriber:
                 results['failed'].append(audio_path)
                 continue
                 
-            success, output_path = self.transcribe_audio(audio_path)
+            success, output_path, _ = self.transcribe_audio(audio_path)
             if success:
                 results['success'].append(output_path)
             else: